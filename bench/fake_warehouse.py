@@ -0,0 +1,302 @@
+"""
+Local stand-in for the Snowpark session, for benchmarks and load tests.
+
+FakeSession answers every query the app sends (recognised by its text) with
+deterministic synthetic data of the same shape Snowflake returns, after an
+optional simulated latency. Install it with `install(FakeSession(...))`.
+"""
+from __future__ import annotations
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+ASSETS = {1: "USD/JPY", 2: "EUR/USD", 3: "GBP/JPY"}
+DURATIONS = ['00:00:15', '00:00:30', '00:01:00', '00:05:00', 'daily']
+PLAYER_IDS = np.arange(44000, 45000)
+TICKS_PER_SEC = 4
+
+# "between 'a' and 'b'" or ">= 'a' and <col> < 'b'"
+_BETWEEN = re.compile(r"(?:between|>=)\s+'([^']+)'\s+and\s+(?:\w+\s*<\s*)?'([^']+)'", re.I)
+
+
+def _between(sql: str) -> tuple[pd.Timestamp, pd.Timestamp]:
+    m = _BETWEEN.search(sql)
+    if not m:
+        now = pd.Timestamp(datetime.utcnow()).floor("D")
+        return now, now + timedelta(days=1)
+    start, end = pd.Timestamp(m.group(1)), pd.Timestamp(m.group(2))
+    if len(m.group(2)) <= 10:  # plain date: whole day
+        end += timedelta(days=1)
+    return start.tz_localize(None), end.tz_localize(None)
+
+def _int_after(sql: str, name: str, default: int) -> int:
+    m = re.search(rf"{name}\s*[=>]?\s*'?(-?\d+)", sql, re.I)
+    return int(m.group(1)) if m else default
+
+def _noise(x: np.ndarray) -> np.ndarray:
+    # deterministic pseudo-random in [0, 1) so the same instant always has the same price
+    return np.modf(np.abs(np.sin(x * 12.9898) * 43758.5453))[0]
+
+def _price(asset_id: int, ts_ms: np.ndarray) -> np.ndarray:
+    t = ts_ms / 1000.0
+    base = {1: 150.0, 2: 1.08, 3: 190.0}.get(asset_id, 100.0)
+    return np.round(base * (1 + 0.002 * np.sin(t / 900) + 0.0004 * np.sin(t / 37)
+                            + 0.0001 * (_noise(t) - 0.5)), 5)
+
+
+class FakeDataFrame:
+    def __init__(self, session: "FakeSession", sql: str):
+        self.session = session
+        self.sql = sql
+
+    def to_pandas(self, block: bool = True):
+        if not block:
+            return FakeAsyncJob(self.session, self.sql)
+        self.session.simulate_latency()
+        return self.session.answer(self.sql)
+
+    def to_pandas_batches(self, batch_rows: int = 100_000):
+        df = self.to_pandas()
+        for start in range(0, max(len(df), 1), batch_rows):
+            yield df.iloc[start:start + batch_rows].reset_index(drop=True)
+
+    def collect(self):
+        self.session.simulate_latency()
+        return []
+
+
+class FakeAsyncJob:
+    """
+    Snowpark AsyncJob of to_pandas(block=False): runs on a thread, and cancel()
+    cuts the simulated latency short (result() then raises, like a cancelled query).
+    """
+
+    def __init__(self, session: "FakeSession", sql: str):
+        self.session = session
+        self.sql = sql
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self._result = None
+        self._error = None
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        try:
+            self.session.simulate_latency(self._cancelled)
+            if self._cancelled.is_set():
+                raise RuntimeError("SQL execution canceled")
+            self._result = self.session.answer(self.sql)
+        except Exception as err:
+            self._error = err
+        finally:
+            self._done.set()
+
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+    def cancel(self):
+        if not self._done.is_set():
+            self._cancelled.set()
+            with self.session._lock:
+                self.session.cancelled += 1
+
+    def result(self) -> pd.DataFrame:
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class FakeSession:
+    """
+    :param latency_s: Simulated warehouse latency per query (seconds)
+    :param jitter: Relative random jitter added to the latency
+    """
+
+    def __init__(self, latency_s: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.latency_s = latency_s
+        self.jitter = jitter
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.cancelled = 0
+
+    def sql(self, sql: str) -> FakeDataFrame:
+        with self._lock:
+            self.queries += 1
+        return FakeDataFrame(self, sql)
+
+    def simulate_latency(self, cancelled: threading.Event | None = None):
+        if self.latency_s:
+            with self._lock:
+                jitter = self._rng.uniform(-self.jitter, self.jitter)
+            delay = max(0.0, self.latency_s * (1 + jitter))
+            if cancelled is None:
+                time.sleep(delay)
+            else:
+                cancelled.wait(delay)
+
+    # ---- answers
+    def answer(self, sql: str) -> pd.DataFrame:
+        s = " ".join(sql.split()).lower()
+        if s.startswith("select count(*) n from ("):
+            inner = sql[sql.index("(", sql.lower().index("from")) + 1:sql.rindex(")")]
+            return pd.DataFrame({"N": [len(self.answer(inner))]})
+        if ") sample (" in s:
+            inner = sql[sql.index("(") + 1:sql.lower().rindex(") sample (")]
+            rows = _int_after(s[s.rindex(") sample ("):], r"sample \(", 1000)
+            df = self.answer(inner)
+            return df.sample(n=min(rows, len(df)), random_state=0) if len(df) else df
+        if "current_warehouse()" in s:
+            return pd.DataFrame({"WAREHOUSE": ["BENCH_WH"]})
+        if s.startswith("create "):
+            return pd.DataFrame()
+        if "from highlow.marketspulse.tfc_assets" in s:
+            return pd.DataFrame({"ASSET_ID": list(ASSETS), "ASSET_NAME": list(ASSETS.values())})
+        if "fixed_duration_value as duration" in s:
+            return pd.DataFrame({"DURATION": DURATIONS})
+        if "ticks_per_sec" in s:
+            return pd.DataFrame({"ASSET_ID": list(ASSETS), "TICKS_PER_SEC": [float(TICKS_PER_SEC)] * len(ASSETS)})
+        if "with windows as" in s:
+            return self._window_ticks(sql)
+        if "time_slice(" in s:
+            return self._bars(sql)
+        if "from highlow.marketspulse.tfc_real_time_data" in s:
+            return self._ticks(sql)
+        if "username, email" in s:
+            return self._players(sql)
+        if "player_name as username" in s:
+            player_id = _int_after(s, r"tp\.player_id", 44554)
+            return pd.DataFrame({"USERNAME": [f"trader{player_id}"], "PLAYER_ID": [player_id], "LTV": [12345.0]})
+        if "prominents as (" in s:
+            return self._top_traders(sql)
+        if "num_traders" in s:
+            return self._kpi(sql)
+        if "trade_action_id" in s:
+            return self._trades(sql)
+        return pd.DataFrame()
+
+    def _ticks(self, sql: str) -> pd.DataFrame:
+        asset_id = _int_after(sql, "asset_id", 1)
+        start, end = _between(sql)
+        step_ms = 1000 // TICKS_PER_SEC
+        ts_ms = np.arange(start.value // 10 ** 6, end.value // 10 ** 6, step_ms, dtype=np.int64)
+        ts_ms = ts_ms + (_noise(ts_ms.astype(float)) * step_ms * 0.8).astype(np.int64)
+        ts = pd.to_datetime(ts_ms, unit="ms")
+        lag = pd.to_timedelta((20 + 180 * _noise(ts_ms / 7.0)).astype(np.int64), unit="ms")
+        return pd.DataFrame({
+            "ASSET_ID": asset_id,
+            "TIMESTAMP": ts,
+            "SENDER_TIMESTAMP": ts - lag,
+            "PRICE": _price(asset_id, ts_ms),
+        })
+
+    def _window_ticks(self, sql: str) -> pd.DataFrame:
+        lookback = timedelta(seconds=abs(_int_after(sql, r"dateadd\(second, ", 10)))
+        trades = self._trades(sql)
+        parts = [
+            self._ticks(f"asset_id = {t.ASSET_ID} between '{t.TRADING_TIME - lookback}' and '{t.CLOSE_TIME}'")
+            for t in trades.itertuples()
+        ]
+        if not parts:
+            return self._ticks("between '1970-01-01 00:00:00' and '1970-01-01 00:00:00'")
+        return pd.concat(parts).drop_duplicates(["ASSET_ID", "TIMESTAMP"]).sort_values(["ASSET_ID", "TIMESTAMP"])
+
+    def _bars(self, sql: str) -> pd.DataFrame:
+        bar_seconds = _int_after(sql, r"time_slice\(timestamp,", 60)
+        ticks = self._ticks(sql)
+        bars = (
+            ticks.assign(BAR_TS=ticks["TIMESTAMP"].dt.floor(f"{bar_seconds}s"))
+            .groupby("BAR_TS")["PRICE"]
+            .agg(OPEN="first", HIGH="max", LOW="min", CLOSE="last", NUM_TICKS="count")
+            .reset_index()
+        )
+        bars.insert(0, "ASSET_ID", int(ticks["ASSET_ID"].iloc[0]) if len(ticks) else 1)
+        return bars
+
+    def _trades(self, sql: str) -> pd.DataFrame:
+        trader_id = _int_after(sql, "trader_id", 44554)
+        start, end = _between(sql)
+        rng = np.random.default_rng(trader_id)
+        days = max(1, (end - start).days)
+        n_groups = 6 * days
+        group_starts = start + pd.to_timedelta(np.sort(rng.uniform(0, (end - start).total_seconds() - 600, n_groups)), unit="s")
+        rows = []
+        for g, g_start in enumerate(group_starts):
+            asset_id = int(rng.choice(list(ASSETS)))
+            for k in range(int(rng.integers(1, 8))):
+                tt = g_start + timedelta(seconds=float(k * rng.uniform(2, 40)))
+                duration = int(rng.choice([15, 30, 60, 300]))
+                ct = tt + timedelta(seconds=duration)
+                t_ms = np.array([tt.value // 10 ** 6, ct.value // 10 ** 6])
+                strikes = _price(asset_id, t_ms)
+                side = "BUY" if rng.random() < 0.5 else "SELL"
+                volume = float(rng.choice([1000, 5000, 10000, 50000]))
+                won = (strikes[1] > strikes[0]) == (side == "BUY")
+                rows.append({
+                    "TRADE_ACTION_ID": 10 ** 9 + g * 10 + k,
+                    "TRADER_ID": trader_id,
+                    "SIDE": side,
+                    "TRADING_TIME": tt, "TRADING_STRIKE": strikes[0],
+                    "CLOSE_TIME": ct, "CLOSE_STRIKE": strikes[1],
+                    "VOLUME": volume, "PROFIT": volume * 0.85 if won else -volume,
+                    "ASSET_ID": asset_id,
+                    "DURATION": f"00:{duration // 60:02d}:{duration % 60:02d}",
+                })
+        return pd.DataFrame(rows)
+
+    def _kpi(self, sql: str) -> pd.DataFrame:
+        start, end = _between(sql)
+        days = max(1, (end - start).days)
+        volume = 2.5e7 * days
+        profits = 0.04 * volume
+        prev_volume, prev_profits = volume * 0.93, profits * 1.05
+        return pd.DataFrame([{"NUM_TRADES": 9000 * days, "NUM_TRADERS": 350 + days, "SITE_PROFITS": profits,
+                              "SITE_VOLUME": volume, "MARGIN": profits / volume,
+                              "PREV_NUM_TRADES": 8700 * days, "PREV_NUM_TRADERS": 340 + days,
+                              "PREV_SITE_PROFITS": prev_profits, "PREV_SITE_VOLUME": prev_volume,
+                              "PREV_MARGIN": prev_profits / prev_volume}])
+
+    def _top_traders(self, sql: str) -> pd.DataFrame:
+        limit_rows = _int_after(sql, "limit", 10)
+        rng = np.random.default_rng(7)
+        rows = []
+        for rank, player_id in enumerate(PLAYER_IDS[:limit_rows]):
+            pnl = 200000.0 / (rank + 1)
+            for m in range(12):
+                rows.append({
+                    "PLAYER_NAME": f"trader{player_id}", "PLAYER_ID": int(player_id),
+                    "NUM_TRADES": 500 - rank * 10, "VOL": pnl * 20, "TRADER_PNL": pnl, "NOTES": "",
+                    "TRADER_RANK": rank + 1, "PREV_RANK": None if rank % 4 == 3 else (rank + 1) ^ 1,
+                    "PREV_TRADER_PNL": pnl * 0.9,
+                    "LTV": pnl * 3, "MM": pd.Timestamp(2025, m + 1, 1),
+                    "INVEST": -rng.uniform(1e4, 1e5), "DEPOSIT": rng.uniform(1e3, 5e4),
+                    "WITHDRAWAL": -rng.uniform(0, 3e4), "BONUS": 0.0,
+                    "INCOME": rng.uniform(1e4, 1.1e5), "ADJUSTMENTS": 0.0,
+                })
+        return pd.DataFrame(rows)
+
+    def _players(self, sql: str) -> pd.DataFrame:
+        min_player_id = _int_after(sql, "player_id", -1)
+        ids = PLAYER_IDS[PLAYER_IDS > min_player_id]
+        return pd.DataFrame({
+            "PLAYER_ID": ids,
+            "USERNAME": [f"trader{i}" for i in ids],
+            "EMAIL": [f"trader{i}@example.com" for i in ids],
+        })
+
+
+def install(fake: FakeSession):
+    """
+    Route lib.db to the fake session (module globals are looked up at call time).
+    """
+    from lib import db
+
+    db.session = fake
+    db.get_session = lambda profile=None: fake
+    return fake
@@ -0,0 +1,325 @@
+"""
+Concurrent-session load test of the data layer: N simulated analysts, each on its own
+thread, run the data path of every rerun their actions cause - the same lib.db,
+lib.snapshots, lib.tick_store and page helper calls main.py and the pages make, without
+the Streamlit rendering - against bench.fake_warehouse. They share this process's
+result cache, single-flight and warehouse session exactly as the sessions of one server
+do, and the run reports throughput, latency percentiles, cache hit rates and memory
+growth per N. Full reruns, rendering included, are measured by bench.rerun_latency.
+
+    python -m bench.load_test                                  # N = 1, 2, 5, 10, 25, 50, 100
+    python -m bench.load_test --sessions 1,10,50 --latency 0.5 --duration 60
+    python -m bench.load_test --json load.json                 # also write the table as JSON
+
+Every session loads the Overview, then keeps picking actions from WORKLOAD (with
+--think seconds between them) until --duration runs out. Actions that raise are
+counted as errors and left out of the latency figures. Run from the repository root.
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bench.fake_warehouse import ASSETS, DURATIONS, FakeSession, install  # noqa: E402
+
+# Relative frequency of each action in a session's mix
+WORKLOAD = {
+    "overview_load": 0.15,
+    "filter_change": 0.35,
+    "trader_drilldown": 0.15,
+    "group_paging": 0.35,
+}
+DATE_RANGES = ["Today", "This Week", "This Month", "This Year"]
+TRADER_IDS = [44554, 44017, 44321, 44890]
+
+
+class SimulatedSession:
+    """
+    One analyst: its filters, the page it is on and what the app keeps in its
+    st.session_state (recorded in lib.memory like a real session's).
+    """
+
+    def __init__(self, session_id: str, rng: random.Random):
+        self.session_id = session_id
+        self.rng = rng
+        self.page = "Overview"
+        self.selected_range = DATE_RANGES[0]
+        self.asset_ids = list(ASSETS)
+        self.trader_id = None
+        self.group_idx = 1
+        self.state = {}
+
+    def _rerun(self):
+        """
+        What main.py fetches on every rerun, then the current page's data.
+        """
+        from lib import formats
+        from lib.db import read_sql
+        from queries.filter_lists import assets_list, durations_list
+
+        df_assets = read_sql(assets_list)
+        self.state["assets_dict"] = dict(zip(df_assets["ASSET_ID"], df_assets["ASSET_NAME"]))
+        read_sql(durations_list)
+
+        start_date, end_date = formats.preset_date_ranges(formats.local_today())[self.selected_range]
+        start_dt_utc, end_dt_utc = formats.utc_range(start_date, end_date)
+        if self.page == "Overview":
+            self._overview(start_dt_utc, end_dt_utc)
+        else:
+            self._trader(start_dt_utc, end_dt_utc)
+        self.state["selected_range"] = self.selected_range
+        self.state["assets"] = list(self.asset_ids)
+
+    def _overview(self, start_dt_utc, end_dt_utc):
+        """
+        Overview.render's data: a snapshot if there is one, else the kpi and top traders queries.
+        """
+        from lib import snapshots
+        from lib.db import read_sql
+
+        all_assets = len(self.asset_ids) == len(ASSETS)
+        snapshot = snapshots.lookup(start_dt_utc, end_dt_utc, all_assets, True, self.selected_range)
+        if snapshot is not None:
+            df_top_traders = snapshot["top_traders"]
+        else:
+            queries = snapshots.overview_queries(start_dt_utc, end_dt_utc, all_assets, True,
+                                                 self.asset_ids, DURATIONS, self.selected_range)
+            sql_kpi, sql_kpi_params, _ = queries["kpi"]
+            read_sql(sql_kpi, params=sql_kpi_params)
+            sql_top_traders, sql_top_traders_params, _ = queries["top_traders"]
+            df_top_traders = read_sql(sql_top_traders, params=sql_top_traders_params, query_name="top_traders")
+        df_top_traders[["PLAYER_NAME", "PLAYER_ID", "VOL", "TRADER_PNL", "NUM_TRADES", "LTV", "NOTES",
+                        "TRADER_RANK", "PREV_RANK"]].drop_duplicates()
+
+    def _trader(self, start_dt_utc, end_dt_utc):
+        """
+        Trader.render's data with the trades chart open (the page's own data helpers).
+        """
+        from manual_pages import Trader
+
+        Trader.get_profile(start_dt_utc, end_dt_utc, self.trader_id)
+        if not Trader.load_trade_gaps(self.state, start_dt_utc, end_dt_utc, self.trader_id):
+            self.state.pop("trade_gaps", None)
+            return
+        self._trades_chart()
+
+    def _trades_chart(self):
+        """
+        Trader._trades_chart's data for the current group at the default gap threshold.
+        """
+        from manual_pages import Trader
+
+        _, trade_gaps = self.state["trade_gaps"]
+        threshold = Trader.GROUPING_GAP_DEFAULT
+        self.state["num_trade_groups"] = num_trade_groups = Trader._group_count(trade_gaps, threshold)
+        if self.group_idx > num_trade_groups:
+            self.group_idx = 1
+        group = Trader.load_group(trade_gaps, self.group_idx, threshold)
+        Trader._prep_for_plotly_chart(group["trades"], group["ticks"], group["bars"])
+
+    def _show_all_trades(self):
+        """
+        Trader.show_trades's data: every trade of the period with its execution quality.
+        """
+        from lib import formats
+        from manual_pages import Trader
+
+        start_date, end_date = formats.preset_date_ranges(formats.local_today())[self.selected_range]
+        Trader.get_enriched_trades(*formats.utc_range(start_date, end_date), self.trader_id)
+
+    def overview_load(self):
+        self.page = "Overview"
+        self._rerun()
+
+    def filter_change(self):
+        if self.rng.random() < 0.5:
+            self.selected_range = self.rng.choice(DATE_RANGES)
+        else:
+            asset = self.rng.choice(list(ASSETS))
+            if asset in self.asset_ids and len(self.asset_ids) > 1:
+                self.asset_ids.remove(asset)
+            elif asset not in self.asset_ids:
+                self.asset_ids.append(asset)
+        self._rerun()
+
+    def trader_drilldown(self):
+        self.page = "Trader"
+        self.trader_id = self.rng.choice(TRADER_IDS)
+        self.group_idx = 1
+        self._rerun()
+        if self.rng.random() < 0.3:
+            self._show_all_trades()
+
+    def group_paging(self):
+        # Prev/Next rerun only the chart fragment
+        num_trade_groups = self.state["num_trade_groups"]
+        step = -1 if self.group_idx >= num_trade_groups or (self.group_idx > 1 and self.rng.random() < 0.3) else 1
+        self.group_idx = min(max(self.group_idx + step, 1), num_trade_groups)
+        self._trades_chart()
+
+    def act(self, name: str) -> str:
+        """
+        Run one action; a paging request without an open chart runs as a drilldown.
+        :return: Name of the action that actually ran
+        """
+        if name == "group_paging" and (self.page != "Trader" or "trade_gaps" not in self.state):
+            name = "trader_drilldown"
+        getattr(self, name)()
+        return name
+
+
+def _quiet_streamlit():
+    """
+    The session threads have no ScriptRunContext (bare mode), and Streamlit warns about
+    that on every cached call. Its loggers don't propagate and get their level when
+    created, so set it on the ones that exist and (set_log_level) on those to come.
+    """
+    from streamlit.logger import set_log_level
+
+    set_log_level("error")
+    for name in list(logging.root.manager.loggerDict):
+        if name == "streamlit" or name.startswith("streamlit."):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+def _error(err: Exception) -> str:
+    frame = traceback.extract_tb(err.__traceback__)[-1]
+    return f"{type(err).__name__}: {err} ({Path(frame.filename).name}:{frame.lineno})"
+
+def _session_loop(index: int, seed: int, deadline: float, think: float, results: list, errors: list):
+    from lib import memory
+
+    rng = random.Random(seed)
+    session = SimulatedSession(f"load-session-{index}", rng)
+    actions, weights = list(WORKLOAD), list(WORKLOAD.values())
+    name = "overview_load"
+    while True:
+        start = time.perf_counter()
+        try:
+            name = session.act(name)
+        except Exception as err:
+            errors.append(f"{name}: {_error(err)}")
+        else:
+            results.append((name, time.perf_counter() - start))
+        memory.record_session(session.session_id, session.state)
+        if time.time() >= deadline:
+            break
+        if think:
+            time.sleep(rng.uniform(0, 2 * think))
+        name = rng.choices(actions, weights)[0]
+
+def _rss_mb() -> float:
+    """
+    Resident memory of this process (Linux /proc; peak RSS elsewhere).
+    """
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+def run_level(n: int, duration: float, think: float, seed: int) -> dict:
+    """
+    Run n concurrent sessions for duration seconds and measure them.
+    """
+    from lib import db, memory
+
+    cache_before, query_before, rss_before = db.cache_stats(), db.query_stats(), _rss_mb()
+    results: list[tuple[str, float]] = []  # successful actions only; list.append is atomic, no lock needed
+    errors: list[str] = []
+    deadline = time.time() + duration
+    threads = [
+        threading.Thread(target=_session_loop, args=(i, seed + i, deadline, think, results, errors),
+                         daemon=True, name=f"load-session-{i}")
+        for i in range(n)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    cache_after, query_after = db.cache_stats(), db.query_stats()
+
+    latencies = np.array([seconds for _, seconds in results]) * 1000
+    hits = cache_after["hits"] - cache_before["hits"]
+    misses = cache_after["misses"] - cache_before["misses"]
+    return {
+        "sessions": n,
+        "actions": len(results),
+        "errors": len(errors),
+        "throughput_per_s": round(len(results) / elapsed, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 1) if len(latencies) else None,
+        "p95_ms": round(float(np.percentile(latencies, 95)), 1) if len(latencies) else None,
+        "p99_ms": round(float(np.percentile(latencies, 99)), 1) if len(latencies) else None,
+        "per_action_p95_ms": {
+            name: round(float(np.percentile([s for a, s in results if a == name], 95)) * 1000, 1)
+            for name in sorted({a for a, _ in results})
+        },
+        "cache_hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+        "warehouse_queries": query_after["executions"] - query_before["executions"],
+        "coalesced": query_after["coalesced"] - query_before["coalesced"],
+        "cancelled": query_after["cancelled"] - query_before["cancelled"],
+        "cache_mb": round(cache_after["bytes"] / 1024 ** 2, 1),
+        "sessions_state_mb": round(memory.sessions_total() / 1024 ** 2, 1),
+        "rss_growth_mb": round(_rss_mb() - rss_before, 1),
+        "first_errors": errors[:3],
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", default="1,2,5,10,25,50,100", help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds each level runs")
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated warehouse latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Relative random jitter on the latency")
+    parser.add_argument("--think", type=float, default=1.0, help="Mean pause between a session's actions (s)")
+    parser.add_argument("--cold", action="store_true", help="Clear the query cache before every level")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)  # the app reads queries/*.sql relative to the working directory
+
+    from lib import db
+    _quiet_streamlit()
+    install(FakeSession(latency_s=args.latency, jitter=args.jitter, seed=args.seed))
+
+    levels = []
+    print(f"{'N':>4}  {'actions':>7}  {'err':>4}  {'act/s':>7}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  "
+          f"{'hit rate':>8}  {'wh q':>6}  {'coal':>5}  {'cache MB':>8}  {'RSS +MB':>8}")
+    for n in (int(v) for v in args.sessions.split(",")):
+        if args.cold:
+            db.clear_cache()
+        level = run_level(n, args.duration, args.think, args.seed + 1000 * n)
+        levels.append(level)
+        fmt = lambda v, spec: format(v, spec) if v is not None else "-"  # noqa: E731
+        print(f"{n:>4}  {level['actions']:>7}  {level['errors']:>4}  {level['throughput_per_s']:>7.2f}  "
+              f"{fmt(level['p50_ms'], '>8.1f')}  {fmt(level['p95_ms'], '>8.1f')}  {fmt(level['p99_ms'], '>8.1f')}  "
+              f"{fmt(level['cache_hit_rate'], '>8.1%')}  {level['warehouse_queries']:>6}  {level['coalesced']:>5}  "
+              f"{level['cache_mb']:>8.1f}  {level['rss_growth_mb']:>8.1f}")
+        for error in level["first_errors"]:
+            print(f"      error: {error}")
+
+    if args.json:
+        args.json.write_text(json.dumps(levels, indent=2) + "\n")
+        print(f"Results written to {args.json}")
+    return 1 if any(level["errors"] for level in levels) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Headless rerun-latency benchmark: drives main.py with streamlit.testing.v1.AppTest
+against bench.fake_warehouse and reports p50/p95 per interaction.
+
+    python -m bench.rerun_latency                    # report, and compare with bench/baseline.json if present
+    python -m bench.rerun_latency --check            # regression gate: baseline required
+    python -m bench.rerun_latency --update-baseline  # store the current numbers
+
+Exits with 1 when an interaction's p50 or p95 is more than --tolerance above the
+baseline, and with 2 under --check when there is no baseline. Run from the repository root.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bench.fake_warehouse import FakeSession, install  # noqa: E402
+
+BASELINE_PATH = ROOT / "bench" / "baseline.json"
+
+
+def _timed(results: dict, name: str, action):
+    start = time.perf_counter()
+    at = action()
+    results.setdefault(name, []).append(time.perf_counter() - start)
+    if at.exception:
+        raise RuntimeError(f"{name}: {at.exception[0].message}")
+    return at
+
+def _button(at, label: str):
+    return next(b for b in at.button if b.label == label)
+
+def _change_date_range(at):
+    """
+    Pick the first preset whose dates differ from the ones shown (all presets coincide
+    on Jan 1 only), and check that the date picker followed.
+    """
+    from lib import formats
+
+    shown = tuple(at.date_input(key="date_input").value)
+    presets = formats.preset_date_ranges(formats.local_today())
+    preset = next((name for name, dates in presets.items() if tuple(dates) != shown), "This Year")
+    at = at.selectbox(key="selected_range").select(preset).run()
+    if not at.exception:
+        picked = tuple(at.date_input(key="date_input").value)
+        if picked != tuple(presets[preset]):
+            raise RuntimeError(f"change_date_range: date picker shows {picked}, expected {tuple(presets[preset])}")
+    return at
+
+def run_round(results: dict, timeout: float):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / "main.py"), default_timeout=timeout)
+
+    _timed(results, "load_overview", at.run)
+    _timed(results, "change_date_range", lambda: _change_date_range(at))
+    _timed(results, "toggle_asset_off", lambda: at.multiselect(key="assets__ms").unselect(1).run())
+    _timed(results, "toggle_asset_on", lambda: at.multiselect(key="assets__ms").select(1).run())
+
+    def _open_trader():
+        at.query_params["page"] = "Trader"
+        at.query_params["trader_id"] = "44554"
+        at.session_state["page"] = "Trader"
+        return at.run()
+
+    _timed(results, "open_trader", _open_trader)
+    _timed(results, "show_trades_on_graph", lambda: _button(at, "Show Trades on Graph").click().run())
+    for _ in range(10):
+        if at.button(key="trade_group_next").disabled:
+            break
+        _timed(results, "next_group", lambda: at.button(key="trade_group_next").click().run())
+    for _ in range(10):
+        if at.button(key="trade_group_prev").disabled:
+            break
+        _timed(results, "prev_group", lambda: at.button(key="trade_group_prev").click().run())
+
+def summarize(results: dict) -> dict:
+    return {
+        name: {
+            "p50_ms": round(float(np.percentile(samples, 50)) * 1000, 1),
+            "p95_ms": round(float(np.percentile(samples, 95)) * 1000, 1),
+            "n": len(samples),
+        }
+        for name, samples in results.items()
+    }
+
+def compare(summary: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, cur in summary.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for stat in ("p50_ms", "p95_ms"):
+            if cur[stat] > base[stat] * (1 + tolerance):
+                regressions.append(f"{name} {stat}: {cur[stat]:.1f} ms vs baseline {base[stat]:.1f} ms")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", type=int, default=5, help="Fresh app sessions to script")
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated warehouse latency (s)")
+    parser.add_argument("--cold", action="store_true", help="Clear the query cache before every round")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline")
+    parser.add_argument("--timeout", type=float, default=60, help="AppTest timeout per rerun (s)")
+    parser.add_argument("--check", action="store_true", help="Fail when there is no baseline to compare with")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)  # the app reads queries/*.sql relative to the working directory
+
+    from lib import db
+    install(FakeSession(latency_s=args.latency))
+
+    results: dict[str, list[float]] = {}
+    for _ in range(args.rounds):
+        if args.cold:
+            db.clear_cache()
+        run_round(results, args.timeout)
+
+    summary = summarize(results)
+    width = max(map(len, summary))
+    print(f"{'interaction':<{width}}  {'p50 ms':>9}  {'p95 ms':>9}  {'n':>4}")
+    for name, s in summary.items():
+        print(f"{name:<{width}}  {s['p50_ms']:>9.1f}  {s['p95_ms']:>9.1f}  {s['n']:>4}")
+
+    if args.update_baseline:
+        BASELINE_PATH.write_text(json.dumps(summary, indent=2) + "\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+    if not BASELINE_PATH.exists():
+        print("No baseline yet - run with --update-baseline to store one.")
+        return 2 if args.check else 0
+
+    regressions = compare(summary, json.loads(BASELINE_PATH.read_text()), args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
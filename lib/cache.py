@@ -0,0 +1,112 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Any, Callable, Hashable, Optional
+
+from lib.memory import sizeof
+
+
+class ResultCache:
+    """
+    Process-wide TTL cache for query results with byte accounting.
+
+    Every entry is measured when stored (see lib.memory.sizeof). When the total goes
+    over the budget, entries are evicted by size * idle time, so big results nobody
+    looked at lately go first and small hot ones stay.
+
+    :param ttl: Seconds an entry stays valid (same meaning as st.cache_data ttl)
+    :param budget_bytes: Memory budget shared with everything reported by `reserved`
+    :param reserved: Callable returning bytes held elsewhere (e.g. session state),
+                     subtracted from the budget before evicting
+    """
+
+    def __init__(self, ttl: float, budget_bytes: int,
+                 reserved: Optional[Callable[[], int]] = None):
+        self.ttl = ttl
+        self.budget_bytes = budget_bytes
+        self.reserved = reserved or (lambda: 0)
+        self._lock = threading.Lock()
+        self._entries: dict[Hashable, dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry["created"] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            entry["last_access"] = now
+            entry["hits"] += 1
+            self.hits += 1
+            return entry["value"]
+
+    def put(self, key: Hashable, value: Any, created: Optional[float] = None) -> None:
+        """
+        :param created: When the value was computed, if earlier than now (e.g. taken
+                        from a shared cache), so it expires with the original
+        """
+        now = time.time()
+        nbytes = sizeof(value)
+        with self._lock:
+            self._entries[key] = {
+                "value": value,
+                "bytes": nbytes,
+                "created": now if created is None else created,
+                "last_access": now,
+                "hits": 0,
+            }
+            self._evict(now, keep=key)
+
+    def _evict(self, now: float, keep: Hashable) -> None:
+        # Expired entries first, then by size * idle time until we fit
+        for k in [k for k, e in self._entries.items() if now - e["created"] > self.ttl]:
+            del self._entries[k]
+
+        allowance = self.budget_bytes - self.reserved()
+        total = sum(e["bytes"] for e in self._entries.values())
+        while total > allowance and len(self._entries) > 1:
+            victim = max(
+                (k for k in self._entries if k != keep),
+                key=lambda k: self._entries[k]["bytes"] * (now - self._entries[k]["last_access"] + 1),
+            )
+            total -= self._entries.pop(victim)["bytes"]
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(e["bytes"] for e in self._entries.values())
+
+    def entries(self) -> list[dict]:
+        """Snapshot of entry metadata (no values) for reporting"""
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "key": k,
+                    "bytes": e["bytes"],
+                    "hits": e["hits"],
+                    "age_s": round(now - e["created"], 1),
+                    "idle_s": round(now - e["last_access"], 1),
+                }
+                for k, e in self._entries.items()
+            ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(e["bytes"] for e in self._entries.values()),
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -1,12 +1,22 @@
 from __future__ import annotations
+import math
 import os
-from datetime import date, time, datetime, timedelta
+import re
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from datetime import date, time, datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional, Dict, Any
+from time import monotonic, sleep
+from typing import Optional, Dict, Any, Iterator
+import pandas as pd
 import streamlit as st
 from snowflake.snowpark import Session
 import tomllib  # Python 3.11 stdlib TOML reader
 
+from lib import memory, shared_cache, trace
+from lib.cache import ResultCache
+from queries.trader_sql import queries as trader_queries
+
 # Optional: key-pair auth. Only used if you set private_key_path in the creds file.
 try:
     from cryptography.hazmat.primitives import serialization  # type: ignore
@@ -18,6 +28,121 @@ except Exception:
 
 session = None
 
+# One budget for cached results + session state of all sessions (see lib.memory)
+MEMORY_BUDGET_MB = int(os.getenv("DAILY_MEMORY_BUDGET_MB", "1024"))
+
+_cache = ResultCache(
+    ttl=60,
+    budget_bytes=MEMORY_BUDGET_MB * 1024 ** 2,
+    reserved=memory.sessions_total,
+)
+
+# Cache shared by all server processes (lib.shared_cache), in front of the warehouse
+# and behind _cache; same TTL. Off unless DAILY_SHARED_CACHE is set.
+_shared = shared_cache.from_url(os.getenv("DAILY_SHARED_CACHE", ""), ttl=_cache.ttl)
+
+# Single-flight: concurrent misses on the same query wait for one execution
+_inflight: Dict[tuple, Future] = {}
+_inflight_lock = threading.Lock()
+_query_stats = {"executions": 0, "coalesced": 0, "shared_hits": 0, "cancelled": 0}
+
+# read_sql runs its query as an async warehouse job owned by the session's current
+# script run and polls it (see _RunWait); past the first QUERY_POLL_SECONDS each poll
+# is a Streamlit yield point, so a rerun (changed filter) or stop interrupts the wait
+# and the job is cancelled instead of finishing for nobody. begin_run() also cancels
+# whatever a session's older runs left behind.
+QUERY_POLL_SECONDS = 0.25
+# First pause between polls; it doubles up to QUERY_POLL_SECONDS
+_POLL_FIRST_SECONDS = 0.01
+_runs: Dict[str, int] = {}  # session id -> current run number
+_run_jobs: Dict[tuple, set] = {}  # (session id, run number) -> running AsyncJobs
+
+
+class QueryCancelled(Exception):
+    """
+    The shared execution of a query was cancelled because its run was superseded.
+    """
+
+# A '...' string literal (with '' escapes) kept as is, or a whitespace run (see normalize_sql)
+_WHITESPACE_OUTSIDE_LITERALS = re.compile(r"('(?:[^']|'')*')|\s+")
+
+# Query cost governor: per query class, the most rows we let through, how the size
+# is estimated before running ("count" = COUNT(*) of the query, "tick_density" =
+# per-asset ticks/sec x window) and what an oversized request degrades to.
+QUERY_LIMITS: Dict[str, Dict[str, Any]] = {
+    "all_trades": {"max_rows": 200_000, "estimate": "count", "degrade": "sample"},
+    "rtd_for_trades": {"max_rows": 1_000_000, "estimate": "tick_density", "degrade": "ohlc_bars"},
+}
+# Degraded tick windows are bucketed into at most this many OHLC bars
+GOVERNOR_MAX_BARS = 5000
+
+# Estimates (counts, density stats) are reused for 10 minutes
+_estimates = ResultCache(ttl=600, budget_bytes=16 * 1024 ** 2)
+
+# Compact dtypes per query (keyed by the name in queries/*), applied once in read_sql.
+# Strikes/prices stay float64: FX quotes need more significant digits than float32 has.
+# TRADE_ACTION_ID stays int64: it is a platform-wide counter and can outgrow int32.
+# "timestamp" is the canonical time representation: the column becomes tz-aware UTC
+# and a <COL>_MS int64 epoch-milliseconds twin is added next to it (charts use that).
+SCHEMAS: Dict[str, Dict[str, str]] = {
+    "all_trades": {
+        "TRADE_ACTION_ID": "int64",
+        "TRADER_ID": "int32",
+        "SIDE": "category",
+        "TRADING_TIME": "timestamp",
+        "TRADING_STRIKE": "float64",
+        "CLOSE_TIME": "timestamp",
+        "CLOSE_STRIKE": "float64",
+        "VOLUME": "float32",
+        "PROFIT": "float32",
+        "ASSET_ID": "int32",
+        "DURATION": "category",
+    },
+    "rtd_for_trades": {
+        "ASSET_ID": "int32",
+        "TIMESTAMP": "timestamp",
+        "SENDER_TIMESTAMP": "timestamp",
+        "PRICE": "float64",
+    },
+    "trade_window_ticks": {
+        "ASSET_ID": "int32",
+        "TIMESTAMP": "timestamp",
+        "SENDER_TIMESTAMP": "timestamp",
+        "PRICE": "float64",
+    },
+    "rtd_bars_for_trades": {
+        "ASSET_ID": "int32",
+        "BAR_TS": "timestamp",
+        "OPEN": "float64",
+        "HIGH": "float64",
+        "LOW": "float64",
+        "CLOSE": "float64",
+        "NUM_TICKS": "int32",
+    },
+    "players_index": {
+        "PLAYER_ID": "int32",
+    },
+    "top_traders": {
+        "PLAYER_NAME": "category",
+        "PLAYER_ID": "int32",
+        "NUM_TRADES": "int32",
+        "VOL": "float64",
+        "TRADER_PNL": "float64",
+        "NOTES": "category",
+        "TRADER_RANK": "int32",
+        "PREV_RANK": "int32",
+        "PREV_TRADER_PNL": "float64",
+        "LTV": "float64",
+        "MM": "datetime64[ns]",
+        "INVEST": "float64",
+        "DEPOSIT": "float64",
+        "WITHDRAWAL": "float64",
+        "BONUS": "float64",
+        "INCOME": "float64",
+        "ADJUSTMENTS": "float64",
+    },
+}
+
 
 def _default_cred_paths() -> list[Path]:
     """
@@ -178,35 +303,445 @@ def get_session(profile: Optional[str] = None) -> Session:
     creds, prof_used = _load_creds(profile)
     return _create_local_session(creds)
 
-@st.cache_data(ttl=60, show_spinner=False)
-def read_sql(sql: str, params: dict | None = None, profile: Optional[str] = None):
+def apply_schema(df: pd.DataFrame, query_name: Optional[str]) -> pd.DataFrame:
+    """
+    Cast result columns to the compact dtypes registered in SCHEMAS for query_name.
+    Columns missing from the registry (or from the result) are left untouched.
+    """
+    schema = SCHEMAS.get(query_name) if query_name else None
+    if not schema:
+        return df
+
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        if dtype == "category":
+            df[col] = df[col].astype("category")
+        elif dtype == "timestamp":
+            df[col] = pd.to_datetime(df[col], utc=True)
+            df[f"{col}_MS"] = to_epoch_ms(df[col])
+        elif dtype.startswith("datetime64"):
+            df[col] = pd.to_datetime(df[col])
+        elif dtype.startswith("int") and df[col].isna().any():
+            df[col] = df[col].astype(dtype.capitalize())  # nullable Int32/Int64
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+def to_epoch_ms(s: pd.Series) -> pd.Series:
+    """
+    tz-aware datetimes -> int64 epoch milliseconds (nullable Int64 if there are NaTs).
+    The integers are taken at ms resolution whatever the column's unit (ns, us, ...).
+    """
+    ms = s.dt.as_unit("ms").array.asi8
+    if s.isna().any():
+        return pd.Series(ms, index=s.index).where(s.notna()).astype("Int64")
+    return pd.Series(ms, index=s.index, dtype="int64")
+
+def read_sql(sql: str, params: dict | None = None, profile: Optional[str] = None,
+             query_name: Optional[str] = None):
     """
     Run a Snowflake (Snowpark) SQL and return a pandas DataFrame.
     Use Python .format() style with named params, e.g. {start} {end} {trader_id}.
     Dates/timestamps/strings are auto-quoted here; numbers pass as-is.
+    If query_name is registered in SCHEMAS the result is cast to compact dtypes.
+    Results are cached for 60s in a process-wide cache under the memory budget
+    (MEMORY_BUDGET_MB); callers get a shallow copy, so adding columns is safe.
+    Concurrent callers missing the cache on the same query share one execution.
+    The query is cancelled on the warehouse if the session reruns before it finishes.
     Works in SiS and local Streamlit
     """
-    # session = get_session(profile)
-    global session
+    if query_name in QUERY_LIMITS:
+        sql, params, query_name, notice = govern(sql, params, query_name, profile)
+        if notice:
+            st.warning(notice, icon=":material/speed:")
 
     if params:
-        safe_params = {}
-        for k, v in params.items():
-            if v is None:
-                safe_params[k] = None
-            elif isinstance(v, (datetime, date, time, str)):
-                safe_params[k] = f"'{v}'"
-            else:
-                safe_params[k] = v
-        sql = sql.format(**safe_params)
+        sql = render_sql(sql, params)
         with st.expander('query:'):
             st.code(sql)
 
-    try:
-        return session.sql(sql).to_pandas()
-    except:
+    key = (normalize_sql(sql), profile, query_name)
+    df = _cache.get(key)
+    with trace.span("db.read_sql", query_name=query_name, cache_hit=df is not None):
+        if df is None:
+            df = _fetch_once(key, sql, profile, query_name)
+        return df.copy(deep=False)
+
+def result_stamp(df: pd.DataFrame) -> tuple:
+    """
+    Cheap identity of a read_sql result (or a frame derived from one) for keying caches
+    of things built from it: when its query ran plus its row count, so a re-fetch
+    after the TTL or "Refresh Data" gives a new stamp.
+    """
+    return df.attrs.get("fetched_at"), len(df)
+
+def normalize_sql(sql: str) -> str:
+    """
+    Rendered SQL with whitespace runs collapsed outside string literals, for keying
+    caches: layout differences share an entry, literals that differ in spacing don't.
+    """
+    return _WHITESPACE_OUTSIDE_LITERALS.sub(lambda m: m.group(1) or " ", sql).strip()
+
+class Raw(str):
+    """
+    SQL fragment (table name, subquery) that render_sql inserts without quoting.
+    """
+
+def render_sql(sql: str, params: dict) -> str:
+    """
+    Fill .format() placeholders, quoting dates/timestamps/strings (numbers and Raw pass as-is).
+    """
+    safe_params = {}
+    for k, v in params.items():
+        if v is None:
+            safe_params[k] = None
+        elif isinstance(v, Raw):
+            safe_params[k] = v
+        elif isinstance(v, datetime) and v.tzinfo is not None:
+            # warehouse timestamps are naive UTC
+            safe_params[k] = f"'{v.astimezone(timezone.utc).replace(tzinfo=None)}'"
+        elif isinstance(v, (datetime, date, time, str)):
+            safe_params[k] = f"'{v}'"
+        else:
+            safe_params[k] = v
+    return sql.format(**safe_params)
+
+def fetch_sql(sql: str, params: dict | None = None, profile: Optional[str] = None,
+              query_name: Optional[str] = None) -> pd.DataFrame:
+    """
+    Uncached read_sql without any Streamlit output, for background jobs and scripts.
+    """
+    if params:
+        sql = render_sql(sql, params)
+    return _fetch(sql, profile, query_name)
+
+def iter_sql(sql: str, params: dict | None = None, profile: Optional[str] = None,
+             query_name: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a result as pandas batches (Snowpark to_pandas_batches), each cast with
+    apply_schema. Nothing is cached or shown; peak memory is one batch plus whatever
+    the consumer keeps (see lib.folds for aggregating consumers).
+    """
+    global session
+
+    if params:
+        sql = render_sql(sql, params)
+    if session is None:
         session = get_session(profile)
-        return session.sql(sql).to_pandas()
+    for batch in session.sql(sql).to_pandas_batches():
+        yield apply_schema(batch, query_name)
+
+def fold_sql(sql: str, fold, params: dict | None = None, profile: Optional[str] = None,
+             query_name: Optional[str] = None):
+    """
+    Feed every batch of iter_sql into fold (an object with add(batch) and result())
+    and return fold.result().
+    """
+    for batch in iter_sql(sql, params=params, profile=profile, query_name=query_name):
+        fold.add(batch)
+    return fold.result()
+
+def _fetch_once(key: tuple, sql: str, profile: Optional[str], query_name: Optional[str]) -> pd.DataFrame:
+    """
+    Run _fetch for key unless the same query is already running, in which case
+    wait for that execution and share its result (or its error).
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+        else:
+            _query_stats["coalesced"] += 1
+
+    if not leader:
+        try:
+            # blocks on the future itself (wakes as soon as the leader is done); the
+            # timeout only bounds how long a rerun of this session waits to be noticed
+            with _RunWait(query_name, interruptible=_script_run() is not None) as waiter:
+                while True:
+                    try:
+                        return future.result(timeout=waiter.delay)
+                    except FutureTimeout:
+                        waiter.tick()
+        except QueryCancelled:
+            # the leader's run was superseded; this run still wants the result
+            return _fetch_once(key, sql, profile, query_name)
+
+    try:
+        df, created = _fetch_shared(key, sql, profile, query_name, run_bound=True)
+        df.attrs["fetched_at"] = created  # carried by the copies read_sql hands out (see result_stamp)
+        _cache.put(key, df, created=created)
+        future.set_result(df)
+        return df
+    except Exception as err:
+        future.set_exception(err)
+        raise
+    except BaseException:
+        # Streamlit's rerun/stop exceptions belong to this run only
+        future.set_exception(QueryCancelled(query_name))
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+def _fetch_shared(key: tuple, sql: str, profile: Optional[str], query_name: Optional[str],
+                  run_bound: bool = False) -> tuple[pd.DataFrame, float]:
+    """
+    _fetch through the shared cache: take the result another process stored, or run
+    the query under the key's cross-process lock (so the other processes wait for
+    this one instead of running it too) and store it.
+    :return: (DataFrame, created) - created is when the result was computed
+    """
+    if _shared is None:
+        return _execute(sql, profile, query_name, run_bound), datetime.now().timestamp()
+
+    skey = shared_cache.cache_key(key)
+    with trace.span("db.shared_cache", query_name=query_name):
+        found = _shared.get(skey)
+        if found is None:
+            # another process may hold the key for minutes; a rerun of this session
+            # must still be able to end the wait (see _RunWait)
+            waiter = _RunWait(query_name, interruptible=run_bound and _script_run() is not None)
+            with waiter, _shared.lock(skey, wait=waiter.sleep):
+                waiter.close()
+                found = _shared.get(skey)  # stored by another process while we waited
+                if found is None:
+                    df, created = _execute(sql, profile, query_name, run_bound), datetime.now().timestamp()
+                    _shared.put(skey, df, created)
+                    return df, created
+    # Arrow keeps the dtypes apply_schema set, so the result is used as is
+    with _inflight_lock:
+        _query_stats["shared_hits"] += 1
+    return found
+
+def _execute(sql: str, profile: Optional[str], query_name: Optional[str], run_bound: bool = False) -> pd.DataFrame:
+    """
+    _fetch, counted as a warehouse execution in query_stats.
+    """
+    with _inflight_lock:
+        _query_stats["executions"] += 1
+    return _fetch(sql, profile, query_name, run_bound)
+
+def _fetch(sql: str, profile: Optional[str], query_name: Optional[str], run_bound: bool = False) -> pd.DataFrame:
+    """
+    Execute on the warehouse (no caching) and cast to the registered schema.
+    :param run_bound: Run as an async job owned by the current script run (see _run_job)
+    """
+    # session = get_session(profile)
+    global session
+
+    run = _script_run() if run_bound else None
+    with trace.span("db.execute_to_pandas", query_name=query_name, async_job=run is not None):
+        try:
+            df = _run_job(session, sql, query_name, run) if run else session.sql(sql).to_pandas()
+        except Exception:
+            session = get_session(profile)
+            df = _run_job(session, sql, query_name, run) if run else session.sql(sql).to_pandas()
+    with trace.span("db.apply_schema", query_name=query_name, rows=len(df)):
+        return apply_schema(df, query_name)
+
+def _script_run() -> Optional[tuple]:
+    """
+    (session id, run number) of the script run on this thread, None outside one
+    (background threads, scripts).
+    """
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except Exception:
+        return None
+    if ctx is None:
+        return None
+    with _inflight_lock:
+        return ctx.session_id, _runs.get(ctx.session_id, 0)
+
+def _run_job(session, sql: str, query_name: Optional[str], run: tuple) -> pd.DataFrame:
+    """
+    Run sql as an async job registered to run and poll it (_RunWait); if the wait
+    is interrupted (rerun/stop) the job is cancelled on the warehouse.
+    """
+    job = session.sql(sql).to_pandas(block=False)
+    with _inflight_lock:
+        _run_jobs.setdefault(run, set()).add(job)
+    try:
+        with _RunWait(query_name) as waiter:
+            while not job.is_done():
+                waiter.sleep()
+    except BaseException:
+        _cancel(job)
+        raise
+    finally:
+        with _inflight_lock:
+            jobs = _run_jobs.get(run)
+            if jobs is not None:
+                jobs.discard(job)
+                if not jobs:
+                    del _run_jobs[run]
+    return job.result()
+
+class _RunWait:
+    """
+    Backoff for a script run waiting on the warehouse: pauses start at
+    _POLL_FIRST_SECONDS and double up to QUERY_POLL_SECONDS, so quick queries are
+    picked up within milliseconds. Once the wait is longer than QUERY_POLL_SECONDS,
+    each tick() updates a status line with the elapsed time - a Streamlit yield point,
+    where a pending rerun/stop is raised (RerunException/StopException) into the wait.
+    :param interruptible: False where there is no script run (plain waiting, no status line)
+    """
+
+    def __init__(self, query_name: Optional[str], interruptible: bool = True):
+        self.label = query_name or "query"
+        self.interruptible = interruptible
+        self.delay = _POLL_FIRST_SECONDS
+        self.started = monotonic()
+        self._status = None
+
+    def sleep(self):
+        sleep(self.delay)
+        self.tick()
+
+    def tick(self):
+        self.delay = min(self.delay * 2, QUERY_POLL_SECONDS)
+        elapsed = monotonic() - self.started
+        if self.interruptible and elapsed >= QUERY_POLL_SECONDS:
+            if self._status is None:
+                self._status = st.empty()
+            self._status.caption(f"Running {self.label}... {elapsed:.0f}s")
+
+    def close(self):
+        if self._status is not None:
+            self._status.empty()
+            self._status = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _cancel(job):
+    try:
+        job.cancel()
+    except Exception:
+        pass  # already finished, or the connection is gone (the warehouse drops it then)
+    with _inflight_lock:
+        _query_stats["cancelled"] += 1
+
+def begin_run():
+    """
+    Start a new script run for the current session (call at the top of the script):
+    queries still running for its previous runs are cancelled.
+    """
+    run = _script_run()
+    if run is None:
+        return
+    session_id, previous = run
+    with _inflight_lock:
+        _runs[session_id] = previous + 1
+        stale = [key for key in _run_jobs if key[0] == session_id]
+        jobs = [job for key in stale for job in _run_jobs.pop(key)]
+    for job in jobs:
+        _cancel(job)
+
+def govern(sql: str, params: dict | None, query_name: str, profile: Optional[str] = None):
+    """
+    Estimate the result size of a query class listed in QUERY_LIMITS and, if it is
+    over the limit, rewrite it into the degraded variant.
+    Estimation problems never block the query: it then runs as requested.
+    :return: (sql, params, query_name, notice) - notice is None when nothing changed
+    """
+    limits = QUERY_LIMITS[query_name]
+    try:
+        rows = estimate_rows(sql, params, query_name, profile)
+    except Exception:
+        return sql, params, query_name, None
+    if rows <= limits["max_rows"]:
+        return sql, params, query_name, None
+
+    size_mb = estimate_bytes(rows, query_name) / 1024 ** 2
+    if limits["degrade"] == "ohlc_bars":
+        seconds = (pd.Timestamp(params["end_ts"]) - pd.Timestamp(params["start_ts"])).total_seconds()
+        bar_seconds = max(1, math.ceil(seconds / GOVERNOR_MAX_BARS))
+        sql = trader_queries["rtd_bars_for_trades"]
+        params = {**params, "bar_seconds": bar_seconds}
+        query_name, instead = "rtd_bars_for_trades", f"{bar_seconds}s OHLC bars"
+    else:
+        sql = f"select * from ({sql}) sample ({limits['max_rows']} rows)"
+        instead = f"a random sample of {limits['max_rows']:,} rows"
+
+    notice = (f"This request would return ~{rows:,} rows (~{size_mb:,.0f} MB), over the "
+              f"{limits['max_rows']:,} row limit. Showing {instead} instead - narrow the date range for full detail.")
+    return sql, params, query_name, notice
+
+def estimate_rows(sql: str, params: dict | None, query_name: str, profile: Optional[str] = None) -> int:
+    """
+    Cheap row-count estimate for a query class listed in QUERY_LIMITS.
+    """
+    if QUERY_LIMITS[query_name]["estimate"] == "tick_density":
+        seconds = (pd.Timestamp(params["end_ts"]) - pd.Timestamp(params["start_ts"])).total_seconds()
+        return int(_tick_density(profile).get(int(params["asset_id"]), 0.0) * max(seconds, 0))
+
+    count_sql = f"select count(*) N from ({render_sql(sql, params) if params else sql})"
+    key = (normalize_sql(count_sql), profile)
+    rows = _estimates.get(key)
+    if rows is None:
+        rows = int(_fetch(count_sql, profile, None)["N"].iloc[0])
+        _estimates.put(key, rows)
+    return rows
+
+def _tick_density(profile: Optional[str] = None) -> dict:
+    """
+    Ticks per second per asset (busiest recent day), for tick query estimates.
+    """
+    key = ("tick_density", profile)
+    density = _estimates.get(key)
+    if density is None:
+        df = _fetch(trader_queries["tick_density"], profile, None)
+        density = dict(zip(df["ASSET_ID"].astype(int), df["TICKS_PER_SEC"].astype(float)))
+        _estimates.put(key, density)
+    return density
+
+def estimate_bytes(rows: int, query_name: Optional[str]) -> int:
+    """
+    In-memory size of `rows` rows after apply_schema (strings/unknown columns ~64 bytes).
+    """
+    schema = SCHEMAS.get(query_name) or {}
+    row_bytes = sum(
+        4 if dtype == "category" else 16 if dtype == "timestamp" else 8 if dtype.startswith("datetime64")
+        else pd.api.types.pandas_dtype(dtype).itemsize
+        for dtype in schema.values()
+    ) or 64
+    return rows * row_bytes
+
+def clear_cache():
+    """
+    Drop all cached query results (the "Refresh Data" button), in every process
+    when the shared cache is on.
+    """
+    _cache.clear()
+    if _shared is not None:
+        _shared.clear()
+
+def cache_stats() -> dict:
+    return _cache.stats()
+
+def query_stats() -> dict:
+    """
+    Warehouse executions vs. executions saved by single-flight coalescing and by
+    results other processes stored in the shared cache, plus queries cancelled
+    because their run was superseded.
+    """
+    with _inflight_lock:
+        stats = {**_query_stats, "in_flight": len(_inflight)}
+    if _shared is not None:
+        stats["shared"] = _shared.stats()
+    return stats
+
+def cache_entries() -> list[dict]:
+    return _cache.entries()
 
 def execute_sql(sql: str, *, profile: Optional[str] = None):
     """
@@ -0,0 +1,138 @@
+"""
+Per-trade execution quality, computed for all trades at once against the ticks
+around them (no per-trade or per-group loops):
+entry/close strike vs. the tick in force, feed lag at entry and the maximum
+favorable/adverse excursion (MFE/MAE) over the trade's life.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+# How far back the tick "in force" at TRADING_TIME may lie
+ENTRY_LOOKBACK_SECONDS = 10
+
+# Composite (asset, time) key: asset rank in the high bits, epoch ms in the low 43
+# (2**43 ms is ~280 years), so one searchsorted covers every asset
+_KEY_SHIFT = 43
+
+ENRICHED_COLUMNS = ["ENTRY_TICK_PRICE", "ENTRY_EDGE", "ENTRY_TICK_AGE_MS", "ENTRY_FEED_LAG_MS",
+                    "CLOSE_TICK_PRICE", "CLOSE_EDGE", "LIFE_TICKS", "MFE", "MAE"]
+
+
+def _keys(asset_rank: np.ndarray, ts_ms: np.ndarray) -> np.ndarray:
+    return (asset_rank.astype(np.int64) << _KEY_SHIFT) | ts_ms.astype(np.int64)
+
+def _ms(s: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Epoch-ms column (int64, or nullable Int64 when it has NaTs - open trades have no
+    CLOSE_TIME) -> (plain int64 values with 0 for nulls, mask of the non-null rows).
+    """
+    valid = s.notna().to_numpy()
+    return s.to_numpy(dtype="int64", na_value=0), valid
+
+def _tick_at(trades: pd.DataFrame, ticks: pd.DataFrame, time_col: str, tolerance_ms: int) -> dict[str, np.ndarray]:
+    """
+    Last tick at or before trades[time_col] (same asset, at most tolerance_ms old),
+    as float arrays {TIMESTAMP_MS, SENDER_TIMESTAMP_MS, PRICE} in the row order of
+    trades; NaN where there is no such tick or no time (e.g. open trades at close).
+    """
+    times, valid = _ms(trades[time_col])
+    rows = np.flatnonzero(valid)
+    left = pd.DataFrame({
+        "ASSET_ID": trades["ASSET_ID"].to_numpy(dtype="int64")[rows],
+        "_TIME": times[rows],
+        "_ROW": rows,
+    }).sort_values("_TIME", kind="stable")
+    right = pd.DataFrame({
+        "ASSET_ID": ticks["ASSET_ID"].to_numpy(dtype="int64"),
+        "TIMESTAMP_MS": ticks["TIMESTAMP_MS"].to_numpy(dtype="int64"),
+        "SENDER_TIMESTAMP_MS": ticks["SENDER_TIMESTAMP_MS"].to_numpy(dtype="float64", na_value=np.nan),
+        "PRICE": ticks["PRICE"].to_numpy(dtype="float64"),
+    })
+    joined = pd.merge_asof(
+        left, right, left_on="_TIME", right_on="TIMESTAMP_MS", by="ASSET_ID",
+        direction="backward", tolerance=tolerance_ms, allow_exact_matches=True,
+    )
+    found = {}
+    for col in ("TIMESTAMP_MS", "SENDER_TIMESTAMP_MS", "PRICE"):
+        found[col] = np.full(len(trades), np.nan)
+        found[col][joined["_ROW"].to_numpy()] = joined[col].to_numpy(dtype="float64", na_value=np.nan)
+    return found
+
+def enrich_trades(trades: pd.DataFrame, ticks: pd.DataFrame,
+                  lookback_seconds: int = ENTRY_LOOKBACK_SECONDS) -> pd.DataFrame:
+    """
+    Adds ENRICHED_COLUMNS to trades. Edges and excursions are in price units and
+    signed from the trader's side: positive = in the trader's favour.
+        ENTRY_EDGE       (entry tick - TRADING_STRIKE) for BUY, the reverse for SELL
+        ENTRY_TICK_AGE_MS TRADING_TIME - TIMESTAMP of the entry tick (staleness)
+        ENTRY_FEED_LAG_MS TIMESTAMP - SENDER_TIMESTAMP of the entry tick
+        CLOSE_EDGE       (CLOSE_STRIKE - close tick) for BUY, the reverse for SELL
+        MFE / MAE        best / worst tick vs TRADING_STRIKE between TRADING_TIME and CLOSE_TIME
+    :param trades: all_trades rows (SIDE, ASSET_ID, *_STRIKE, TRADING_TIME_MS, CLOSE_TIME_MS)
+    :param ticks: rtd_for_trades rows for the trades' assets and lifetimes (any order)
+    :param lookback_seconds: Max age of the tick taken as "in force" at entry/close
+    :return: trades with the extra columns (NaN where no tick was found; close-side
+             metrics, LIFE_TICKS and MFE/MAE are NaN for open trades without CLOSE_TIME)
+    """
+    out = trades.copy(deep=False)
+    if trades.empty or ticks.empty:
+        for col in ENRICHED_COLUMNS:
+            out[col] = np.nan
+        return out
+
+    ticks = ticks.sort_values(["TIMESTAMP_MS"], kind="stable")  # merge_asof needs both sides sorted
+    side = np.where(trades["SIDE"].astype(str).to_numpy() == "SELL", -1.0, 1.0)
+    strike = trades["TRADING_STRIKE"].to_numpy(dtype="float64")
+    tolerance_ms = int(lookback_seconds * 1000)
+
+    # ---- entry / close: sorted as-of joins
+    entry = _tick_at(trades, ticks, "TRADING_TIME_MS", tolerance_ms)
+    out["ENTRY_TICK_PRICE"] = entry["PRICE"]
+    out["ENTRY_EDGE"] = side * (entry["PRICE"] - strike)
+    out["ENTRY_TICK_AGE_MS"] = trades["TRADING_TIME_MS"].to_numpy(dtype="float64", na_value=np.nan) - entry["TIMESTAMP_MS"]
+    out["ENTRY_FEED_LAG_MS"] = entry["TIMESTAMP_MS"] - entry["SENDER_TIMESTAMP_MS"]
+
+    close = _tick_at(trades, ticks, "CLOSE_TIME_MS", tolerance_ms)
+    out["CLOSE_TICK_PRICE"] = close["PRICE"]
+    out["CLOSE_EDGE"] = side * (trades["CLOSE_STRIKE"].to_numpy(dtype="float64", na_value=np.nan) - close["PRICE"])
+
+    # ---- MFE / MAE: one tick array sorted by (asset, time), a [lo, hi) range per trade
+    # and max/min reduceat over all ranges at once
+    asset_ids = np.unique(ticks["ASSET_ID"].to_numpy())
+    tick_rank = np.searchsorted(asset_ids, ticks["ASSET_ID"].to_numpy())
+    tick_keys = _keys(tick_rank, ticks["TIMESTAMP_MS"].to_numpy(dtype="int64"))
+    order = np.argsort(tick_keys, kind="stable")
+    tick_keys, prices = tick_keys[order], ticks["PRICE"].to_numpy(dtype="float64")[order]
+
+    trade_assets = trades["ASSET_ID"].to_numpy()
+    trade_rank = np.searchsorted(asset_ids, trade_assets).clip(0, len(asset_ids) - 1)
+    known = asset_ids[trade_rank] == trade_assets
+    trading_ms, has_entry = _ms(trades["TRADING_TIME_MS"])
+    close_ms, has_close = _ms(trades["CLOSE_TIME_MS"])
+    # open trades (no CLOSE_TIME) get an empty range and NaN metrics
+    closed = known & has_entry & has_close
+    lo = np.searchsorted(tick_keys, _keys(trade_rank, trading_ms), side="left")
+    hi = np.where(closed, np.searchsorted(tick_keys, _keys(trade_rank, close_ms), side="right"), lo)
+    hi = np.maximum(hi, lo)
+    life_ticks = hi - lo
+
+    # reduceat over interleaved [lo0, hi0, lo1, hi1, ...] reduces a[lo_i:hi_i] at even
+    # positions. Ranges are visited in lo order so the odd (discarded) gaps between
+    # them add up to at most one pass over the ticks; a padding element keeps
+    # hi == len(prices) a valid index.
+    by_lo = np.argsort(lo, kind="stable")
+    padded = np.append(prices, np.nan)
+    bounds = np.column_stack([lo[by_lo], hi[by_lo]]).ravel()
+    high, low = np.empty(len(lo)), np.empty(len(lo))
+    high[by_lo] = np.maximum.reduceat(padded, bounds)[::2]
+    low[by_lo] = np.minimum.reduceat(padded, bounds)[::2]
+    has_ticks = life_ticks > 0
+    high, low = np.where(has_ticks, high, np.nan), np.where(has_ticks, low, np.nan)
+
+    out["LIFE_TICKS"] = np.where(closed, life_ticks, np.nan)
+    out["MFE"] = np.where(side > 0, high - strike, strike - low)
+    out["MAE"] = np.where(side > 0, low - strike, strike - high)
+    return out
@@ -0,0 +1,50 @@
+"""
+Aggregations that consume a query result batch by batch (db.fold_sql / db.iter_sql),
+so only the aggregate - never the full result - is held in memory.
+Every fold has add(batch) and result().
+"""
+from __future__ import annotations
+
+import pandas as pd
+
+
+class OHLCFold:
+    """
+    Downsamples ticks (TIMESTAMP, PRICE; ordered by TIMESTAMP) into OHLC bars.
+    Memory is one row per bar.
+    :param bar_seconds: Bar size
+    """
+
+    def __init__(self, bar_seconds: int):
+        self.freq = f"{int(bar_seconds)}s"
+        self._parts: list[pd.DataFrame] = []
+
+    def add(self, batch: pd.DataFrame):
+        if batch.empty:
+            return
+        self.add_bars(
+            batch.assign(BAR_TS=batch["TIMESTAMP"].dt.floor(self.freq))
+            .groupby("BAR_TS", sort=True)["PRICE"]
+            .agg(OPEN="first", HIGH="max", LOW="min", CLOSE="last", NUM_TICKS="count")
+        )
+
+    def add_bars(self, bars: pd.DataFrame):
+        """
+        Merge bars of the same size that are already folded (indexed by BAR_TS, e.g. an
+        earlier result().set_index("BAR_TS")) and follow everything added so far.
+        """
+        if bars.empty:
+            return
+        # Only the last bar of the previous batch can continue into this one
+        if self._parts and self._parts[-1].index[-1] == bars.index[0]:
+            bars = bars.copy()
+            prev, cur = self._parts[-1].iloc[-1], bars.iloc[0]
+            bars.iloc[0] = [prev["OPEN"], max(prev["HIGH"], cur["HIGH"]), min(prev["LOW"], cur["LOW"]),
+                            cur["CLOSE"], prev["NUM_TICKS"] + cur["NUM_TICKS"]]
+            self._parts[-1] = self._parts[-1].iloc[:-1]
+        self._parts.append(bars)
+
+    def result(self) -> pd.DataFrame:
+        if not self._parts:
+            return pd.DataFrame(columns=["BAR_TS", "OPEN", "HIGH", "LOW", "CLOSE", "NUM_TICKS"])
+        return pd.concat(self._parts).reset_index()
@@ -3,19 +3,70 @@ from datetime import datetime, time, timedelta
 from pyecharts.commons.utils import JsCode
 
 
-today = (datetime.today() + timedelta(hours=2)).date()
+def local_today():
+    return (datetime.today() + timedelta(hours=2)).date()
+
+today = local_today()
 
 ALL = "__ALL__"
 
-sections = ["Overview", "Trader"]
+sections = ["Overview", "Trader", "Scanner"]
 default_section = sections[0]
 
-date_ranges = {
-    "Today": [today, today],
-    "This Week": [today - timedelta(days=today.weekday()), today],
-    "This Month": [today.replace(day=1), today],
-    "This Year": [today.replace(month=1, day=1), today]
-}
+def preset_date_ranges(today):
+    return {
+        "Today": [today, today],
+        "This Week": [today - timedelta(days=today.weekday()), today],
+        "This Month": [today.replace(day=1), today],
+        "This Year": [today.replace(month=1, day=1), today]
+    }
+
+date_ranges = preset_date_ranges(today)
+
+def utc_range(start_date, end_date):
+    """
+    Local (UTC+2) calendar days -> start/end datetimes in UTC
+    """
+    return (datetime.combine(start_date, time.min) - timedelta(hours=2),
+            datetime.combine(end_date, time.max) - timedelta(hours=2))
+
+def _shift_months(d, months):
+    month = d.month - 1 + months
+    year, month = d.year + month // 12, month % 12 + 1
+    last_day = (datetime(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)).day
+    return d.replace(year=year, month=month, day=min(d.day, last_day))
+
+def previous_period(start_date, end_date, preset=None):
+    """
+    The previous equivalent period for the KPI / leaderboard comparison, by the preset
+    the dates come from: Today -> yesterday, This Week -> the same weekdays last week,
+    This Month / This Year -> the same days of last month / year (clamped to the
+    month's length). Manual ranges (preset None) -> the same number of days right before.
+    """
+    if preset == "Today":
+        return start_date - timedelta(days=1), end_date - timedelta(days=1)
+    if preset == "This Week":
+        return start_date - timedelta(days=7), end_date - timedelta(days=7)
+    if preset in ("This Month", "This Year"):
+        months = 1 if preset == "This Month" else 12
+        return _shift_months(start_date, -months), _shift_months(end_date, -months)
+    days = (end_date - start_date).days + 1
+    return start_date - timedelta(days=days), end_date - timedelta(days=days)
+
+def previous_utc_range(start_dt_utc, end_dt_utc, preset=None):
+    """
+    utc_range of the previous_period of a utc_range
+    """
+    start_date = (start_dt_utc + timedelta(hours=2)).date()
+    end_date = (end_dt_utc + timedelta(hours=2)).date()
+    return utc_range(*previous_period(start_date, end_date, preset))
+
+def date_preset(selected_range, start_date, end_date):
+    """
+    The preset name if the dates are still the ones it sets, None for a manual range
+    """
+    preset_dates = preset_date_ranges(local_today()).get(selected_range)
+    return selected_range if preset_dates and tuple(preset_dates) == (start_date, end_date) else None
 durations = ['00:00:15', '00:00:30', '00:01:00', '00:03:00', '00:05:00',
              '00:15:00', '01:00:00', 'daily']
 assets = {
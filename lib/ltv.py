@@ -0,0 +1,32 @@
+import logging
+
+import streamlit as st
+
+from lib import db
+from queries.ltv_sql import queries
+
+
+LTV_TABLE = "highlow.mptemptables.tt_player_ltv"
+# The probe (create-if-not-exists) is repeated this often (seconds), so a fallback
+# after a missing privilege or a warehouse hiccup doesn't stick for the process lifetime
+LTV_PROBE_TTL = 600
+
+_log = logging.getLogger(__name__)
+
+
+@st.cache_resource(ttl=LTV_PROBE_TTL, show_spinner=False)
+def ltv_relation() -> db.Raw:
+    """
+    Relation to join for per-player LTV (columns player_id, ltv).
+    Creates the materialized dynamic table on first use; if that is not possible
+    (e.g. missing privileges) falls back to aggregating tt_lifetime_summary inline.
+    """
+    try:
+        warehouse = db.fetch_sql("select current_warehouse() WAREHOUSE")["WAREHOUSE"].iloc[0]
+        db.execute_sql(queries["create_ltv_table"].format(warehouse=warehouse))
+    except Exception as err:
+        _log.warning("LTV: cannot use dynamic table %s (%s); aggregating inline, retrying in %ss",
+                     LTV_TABLE, err, LTV_PROBE_TTL)
+        return db.Raw(f"({queries['ltv_inline']})")
+    _log.info("LTV: using dynamic table %s", LTV_TABLE)
+    return db.Raw(LTV_TABLE)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# Sessions that did not rerun for this long are dropped from the accounting
+SESSION_IDLE_SECONDS = 3600
+
+_lock = threading.Lock()
+_sessions: dict[str, dict] = {}
+
+
+def sizeof(obj, _seen: set | None = None) -> int:
+    """
+    Deep size of obj in bytes.
+    pandas/numpy objects report their buffers (memory_usage(deep=True) / nbytes),
+    dicts, lists, tuples and sets are walked recursively, anything else is sys.getsizeof.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(sizeof(k, _seen) + sizeof(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(sizeof(v, _seen) for v in obj)
+    return size
+
+def current_session_id() -> str:
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx else "local"
+    except Exception:
+        return "local"
+
+def record_session(session_id: str, state: dict) -> dict[str, int]:
+    """
+    Measure one session's state and remember it for the process-wide totals.
+    :param session_id: Streamlit session id
+    :param state: st.session_state.to_dict()
+    :return: bytes per key
+    """
+    sizes = {str(k): sizeof(v) for k, v in state.items()}
+    now = time.time()
+    with _lock:
+        _sessions[session_id] = {"bytes": sum(sizes.values()), "keys": sizes, "updated": now}
+        for sid in [sid for sid, s in _sessions.items() if now - s["updated"] > SESSION_IDLE_SECONDS]:
+            del _sessions[sid]
+    return sizes
+
+def sessions() -> dict[str, dict]:
+    with _lock:
+        return {sid: dict(s) for sid, s in _sessions.items()}
+
+def sessions_total() -> int:
+    with _lock:
+        return sum(s["bytes"] for s in _sessions.values())
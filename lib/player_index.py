@@ -0,0 +1,143 @@
+from __future__ import annotations
+import bisect
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from lib import db
+from queries.trader_sql import queries
+
+
+# New players are appended every REFRESH_SECONDS (player_id watermark);
+# renames/email changes are picked up by a full reload every FULL_RELOAD_SECONDS
+REFRESH_SECONDS = 60
+FULL_RELOAD_SECONDS = 6 * 3600
+
+_FIELDS = ["PLAYER_ID", "USERNAME", "EMAIL"]
+
+
+class PlayerIndex:
+    """
+    In-memory search over tp_players by ID, username and email.
+
+    Per field it keeps the lowercased keys sorted (prefix search with bisect) and
+    joined into one newline-separated blob (substring search with str.find).
+    A refresh builds a new snapshot and swaps it in, so searches never block.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._players = pd.DataFrame(columns=_FIELDS)
+        self._snapshot = self._build(self._players)
+        self.loaded_at = 0.0
+
+    @staticmethod
+    def _build(players: pd.DataFrame) -> dict:
+        snapshot = {"players": players.reset_index(drop=True), "fields": {}}
+        for field in _FIELDS:
+            keys = players[field].fillna("").astype(str).str.lower().tolist()
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            lengths = np.fromiter((len(k) + 1 for k in keys), dtype=np.int64, count=len(keys))
+            snapshot["fields"][field] = {
+                "sorted_keys": [keys[i] for i in order],
+                "sorted_rows": np.asarray(order, dtype=np.int64),
+                "blob": "\n".join(keys),
+                "offsets": np.concatenate([[0], np.cumsum(lengths)[:-1]]) if len(keys) else np.zeros(0, np.int64),
+            }
+        return snapshot
+
+    def load(self):
+        """Full reload from the warehouse"""
+        players = db.fetch_sql(queries["players_index"], params={"min_player_id": -1},
+                               query_name="players_index")
+        self._swap(players)
+
+    def refresh(self):
+        """Append players newer than the highest ID already indexed"""
+        with self._lock:
+            players = self._players
+        min_player_id = int(players["PLAYER_ID"].max()) if not players.empty else -1
+        new_players = db.fetch_sql(queries["players_index"], params={"min_player_id": min_player_id},
+                                   query_name="players_index")
+        if not new_players.empty:
+            self._swap(pd.concat([players, new_players], ignore_index=True))
+
+    def _swap(self, players: pd.DataFrame):
+        snapshot = self._build(players[_FIELDS])
+        with self._lock:
+            self._players = snapshot["players"]
+            self._snapshot = snapshot
+            self.loaded_at = time.time()
+
+    def __len__(self):
+        return len(self._snapshot["players"])
+
+    def search(self, query: str, limit: int = 20) -> pd.DataFrame:
+        """
+        Prefix matches (ID, username, email) first, then substring matches.
+        :param query: Text typed by the user
+        :param limit: Max rows returned
+        :return: DataFrame [PLAYER_ID, USERNAME, EMAIL]
+        """
+        snapshot = self._snapshot
+        q = query.strip().lower()
+        if not q:
+            return snapshot["players"].iloc[0:0]
+
+        rows: list[int] = []
+        seen: set[int] = set()
+
+        def _add(row):
+            if row not in seen:
+                seen.add(row)
+                rows.append(row)
+
+        for field in _FIELDS:
+            idx = snapshot["fields"][field]
+            keys = idx["sorted_keys"]
+            pos = bisect.bisect_left(keys, q)
+            while pos < len(keys) and keys[pos].startswith(q) and len(rows) < limit:
+                _add(int(idx["sorted_rows"][pos]))
+                pos += 1
+
+        for field in _FIELDS[1:]:
+            idx = snapshot["fields"][field]
+            blob, offsets = idx["blob"], idx["offsets"]
+            pos = blob.find(q)
+            while pos != -1 and len(rows) < limit:
+                row = int(np.searchsorted(offsets, pos, side="right") - 1)
+                _add(row)
+                pos = blob.find(q, offsets[row + 1] if row + 1 < len(offsets) else len(blob))
+
+        return snapshot["players"].iloc[rows[:limit]]
+
+    def get(self, player_id: int) -> pd.DataFrame:
+        players = self._snapshot["players"]
+        return players.loc[players["PLAYER_ID"] == player_id]
+
+
+def _refresh_loop(index: PlayerIndex):
+    last_full = time.time()
+    while True:
+        time.sleep(REFRESH_SECONDS)
+        try:
+            if time.time() - last_full > FULL_RELOAD_SECONDS:
+                index.load()
+                last_full = time.time()
+            else:
+                index.refresh()
+        except Exception:
+            pass  # keep serving the last snapshot; try again next round
+
+@st.cache_resource(show_spinner="Loading player index...")
+def get_player_index() -> PlayerIndex:
+    """
+    One PlayerIndex per process, loaded once and kept fresh by a daemon thread.
+    """
+    index = PlayerIndex()
+    index.load()
+    threading.Thread(target=_refresh_loop, args=(index,), daemon=True, name="player-index-refresh").start()
+    return index
@@ -0,0 +1,193 @@
+"""
+Platform-wide latency-arbitrage scan: every trade in a date range is checked
+against the ticks around it (lib.execution_quality) and traders are ranked by how
+often they enter on a stale price that is already in their favour.
+
+The work is partitioned by (asset, day). Partitions run in a process pool shared by
+all scans, whose workers each open one warehouse session; each worker fetches and
+enriches its own partition and returns per-trader partial sums, so only small frames
+cross process boundaries. In SiS (only the server process has a session), or when
+the workers can't open one, partitions run on threads of this process instead.
+"""
+from __future__ import annotations
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from lib import db
+from lib.execution_quality import ENTRY_LOOKBACK_SECONDS, enrich_trades
+from queries.scanner_sql import queries
+
+
+SCANNER_WORKERS = int(os.getenv("DAILY_SCANNER_WORKERS", str(os.cpu_count() or 2)))
+# An entry is "stale" when the tick in force is older than this, or the feed lagged more
+STALE_TICK_MS = 1000
+FEED_LAG_MS = 500
+# Traders with fewer trades in the range are not ranked
+MIN_TRADES = 20
+
+# The process pool, created on first use and kept for later scans; False once scans
+# run in-process (SiS, or the workers couldn't open a warehouse session)
+_pool = None
+_pool_lock = threading.Lock()
+
+# Per-trader sums returned by every partition (added up across partitions)
+_SUM_COLUMNS = ["TRADES", "WINS", "PROFIT", "VOLUME", "EDGE_SUM", "EDGE_N", "POS_EDGE", "POS_EDGE_WINS",
+                "STALE", "STALE_WINS", "STALE_PROFIT", "LAG_SUM", "LAG_N"]
+
+
+def _partition_sums(trades: pd.DataFrame) -> pd.DataFrame:
+    """
+    Enriched trades of one partition -> one row of _SUM_COLUMNS per TRADER_ID.
+    """
+    won = trades["PROFIT"].to_numpy() > 0
+    edge = trades["ENTRY_EDGE"].to_numpy()
+    lag = trades["ENTRY_FEED_LAG_MS"].to_numpy()
+    stale = (trades["ENTRY_TICK_AGE_MS"].to_numpy() > STALE_TICK_MS) | (lag > FEED_LAG_MS)
+    pos_edge = edge > 0
+    flags = pd.DataFrame({
+        "TRADER_ID": trades["TRADER_ID"].to_numpy(),
+        "TRADES": 1,
+        "WINS": won,
+        "PROFIT": trades["PROFIT"].to_numpy(dtype="float64"),
+        "VOLUME": trades["VOLUME"].to_numpy(dtype="float64"),
+        "EDGE_SUM": np.nan_to_num(edge),
+        "EDGE_N": ~np.isnan(edge),
+        "POS_EDGE": pos_edge,
+        "POS_EDGE_WINS": pos_edge & won,
+        "STALE": stale,
+        "STALE_WINS": stale & won,
+        "STALE_PROFIT": np.where(stale, trades["PROFIT"].to_numpy(dtype="float64"), 0.0),
+        "LAG_SUM": np.nan_to_num(lag),
+        "LAG_N": ~np.isnan(lag),
+    })
+    return flags.groupby("TRADER_ID", sort=False)[_SUM_COLUMNS].sum().reset_index()
+
+def scan_partition(asset_id: int, day_start: datetime, day_end: datetime) -> pd.DataFrame:
+    """
+    Worker: fetch, enrich and sum one (asset, day) partition.
+    Runs in a pool process on the session _init_worker opened, or on a thread of
+    the server process on its shared session.
+    """
+    params = {"asset_id": asset_id, "day_start": day_start, "day_end": day_end}
+    trades = db.fetch_sql(queries["scan_trades"], params=params, query_name="all_trades")
+    if trades.empty:
+        return pd.DataFrame(columns=["TRADER_ID", *_SUM_COLUMNS])
+    ticks = db.fetch_sql(queries["scan_ticks"], params={**params, "lookback_seconds": ENTRY_LOOKBACK_SECONDS},
+                         query_name="trade_window_ticks")
+    return _partition_sums(enrich_trades(trades, ticks))
+
+def partitions(start_dt_utc: datetime, end_dt_utc: datetime, all_assets: int, sel_asset_ids) -> list[tuple]:
+    """
+    (asset_id, day_start, day_end) per asset and day with trades, clipped to the range,
+    biggest first so the pool isn't left waiting on a large straggler.
+    """
+    df = db.fetch_sql(queries["scan_partitions"], params={
+        "start_time": start_dt_utc,
+        "end_time": end_dt_utc,
+        "all_assets": all_assets,
+        "assets": "','".join(map(str, sel_asset_ids)) or '0',
+    })
+    parts = []
+    for row in df.itertuples():
+        day = datetime.combine(pd.Timestamp(row.DAY).date(), datetime.min.time())
+        parts.append((int(row.ASSET_ID), max(day, start_dt_utc), min(day + timedelta(days=1), end_dt_utc)))
+    return parts
+
+def rank_traders(sums: pd.DataFrame, min_trades: int = MIN_TRADES) -> pd.DataFrame:
+    """
+    Add up partition sums per trader and derive the suspicious-edge metrics.
+    SCORE is the share of trades entered with the quoted tick already past the strike
+    in the trader's favour and won (a latency arbitrageur's signature), weighted by
+    how much more often stale entries win than the trader's other trades.
+    """
+    totals = sums.groupby("TRADER_ID")[_SUM_COLUMNS].sum()
+    totals = totals[totals["TRADES"] >= min_trades]
+    if totals.empty:
+        return totals.reset_index()
+
+    fresh = (totals["TRADES"] - totals["STALE"]).clip(lower=1)
+    ranked = pd.DataFrame({
+        "TRADES": totals["TRADES"].astype(int),
+        "WIN_RATE": totals["WINS"] / totals["TRADES"],
+        "PROFIT": totals["PROFIT"],
+        "AVG_ENTRY_EDGE": totals["EDGE_SUM"] / totals["EDGE_N"].clip(lower=1),
+        "POS_EDGE_SHARE": totals["POS_EDGE"] / totals["TRADES"],
+        "POS_EDGE_WIN_RATE": totals["POS_EDGE_WINS"] / totals["POS_EDGE"].clip(lower=1),
+        "STALE_SHARE": totals["STALE"] / totals["TRADES"],
+        "STALE_WIN_RATE": totals["STALE_WINS"] / totals["STALE"].clip(lower=1),
+        "FRESH_WIN_RATE": (totals["WINS"] - totals["STALE_WINS"]) / fresh,
+        "STALE_PROFIT": totals["STALE_PROFIT"],
+        "AVG_FEED_LAG_MS": totals["LAG_SUM"] / totals["LAG_N"].clip(lower=1),
+    })
+    ranked["SCORE"] = (totals["POS_EDGE_WINS"] / totals["TRADES"]) * (
+        1 + (ranked["STALE_WIN_RATE"] - ranked["FRESH_WIN_RATE"]).clip(lower=0))
+    return ranked.sort_values("SCORE", ascending=False).reset_index()
+
+def _init_worker():
+    """
+    Pool initializer: open the worker's warehouse session once; every partition the
+    worker runs, in this scan and later ones, reuses it. Raising here breaks the pool.
+    """
+    db.session = db.get_session()
+
+def _process_pool(workers: int) -> ProcessPoolExecutor | None:
+    """
+    The shared process pool ("spawn": the Streamlit server process has threads, which
+    fork would copy in an undefined state), or None when scans run in-process.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if db._in_sis():
+                _pool = False
+            else:
+                _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_init_worker)
+        return _pool or None
+
+def _drop_process_pool(pool: ProcessPoolExecutor):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = False
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def scan(parts: list[tuple], workers: int = SCANNER_WORKERS, on_progress=None) -> pd.DataFrame:
+    """
+    Run scan_partition for every partition, in the shared process pool or, without
+    one, on up to `workers` threads of this process. A pool that breaks (its workers
+    couldn't open a warehouse session) is dropped and the scan finishes in-process.
+    :param parts: From partitions()
+    :param workers: Pool size (fixed by the first scan) / number of threads
+    :param on_progress: Optional callback(done, total) after each partition
+    :return: rank_traders() of all partitions
+    """
+    results = {}
+
+    def collect(futures: dict):
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if on_progress:
+                on_progress(len(results), len(parts))
+
+    pool = _process_pool(workers) if parts else None
+    if pool is not None:
+        try:
+            collect({pool.submit(scan_partition, *part): part for part in parts})
+        except BrokenProcessPool:
+            _drop_process_pool(pool)
+    todo = [part for part in parts if part not in results]
+    if todo:
+        with ThreadPoolExecutor(max_workers=min(workers, len(todo)), thread_name_prefix="scanner") as threads:
+            collect({threads.submit(scan_partition, *part): part for part in todo})
+
+    sums = (pd.concat(list(results.values()), ignore_index=True) if results
+            else pd.DataFrame(columns=["TRADER_ID", *_SUM_COLUMNS]))
+    return rank_traders(sums)
@@ -0,0 +1,232 @@
+"""
+Result cache shared by all Streamlit server processes behind the load balancer.
+
+lib.db keeps its in-process ResultCache in front of this: a local miss looks here
+before going to the warehouse, and a process that has to run the query holds a
+cross-process lock on the key, so the other processes wait for its result instead
+of running the same query again.
+
+Values are DataFrames stored as Arrow IPC streams (dtypes, categories and time zones
+survive the round trip). Backends, picked by DAILY_SHARED_CACHE:
+    sqlite:///path/to/cache.db   one file on a disk all processes share
+    redis://host:6379/0          Redis (or anything speaking its protocol)
+"""
+from __future__ import annotations
+import hashlib
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+
+# Held locks expire after this long, so a crashed process can't block a key forever
+LOCK_LEASE_SECONDS = 300
+LOCK_POLL_SECONDS = 0.05
+# Entries are compressed on the wire/disk; results are read far more often than written
+IPC_OPTIONS = pa.ipc.IpcWriteOptions(compression="zstd")
+
+
+def to_arrow_bytes(df: pd.DataFrame) -> bytes:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema, options=IPC_OPTIONS) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def from_arrow_bytes(data: bytes) -> pd.DataFrame:
+    return pa.ipc.open_stream(pa.py_buffer(data)).read_all().to_pandas()
+
+def cache_key(key: tuple) -> str:
+    """
+    Stable key across processes (hash() of a str is salted per process).
+    """
+    return hashlib.sha256(repr(key).encode()).hexdigest()
+
+
+class SharedCache:
+    """
+    get/put of DataFrames with a TTL plus a named cross-process lock.
+    Backends implement _get, _put, _acquire, _release and clear.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock_waits = 0
+        self.errors = 0
+
+    def get(self, key: str) -> Optional[tuple[pd.DataFrame, float]]:
+        """
+        :return: (DataFrame, created epoch seconds), or None if missing/expired
+                 (or the backend is unreachable - the shared cache is never required)
+        """
+        try:
+            found = self._get(key, time.time())
+        except Exception:
+            self.errors += 1
+            return None
+        if found is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        data, created = found
+        return from_arrow_bytes(data), created
+
+    def put(self, key: str, df: pd.DataFrame, created: float):
+        try:
+            self._put(key, to_arrow_bytes(df), created, created + self.ttl)
+        except Exception:
+            self.errors += 1
+
+    @contextmanager
+    def lock(self, key: str, timeout: float = LOCK_LEASE_SECONDS, wait: Optional[Callable[[], None]] = None):
+        """
+        Hold the cross-process lock on key. Gives up waiting after timeout (the
+        caller then just computes the value itself).
+        :param wait: Pause between attempts instead of sleeping LOCK_POLL_SECONDS; an
+                     exception it raises abandons the wait (lib.db lets a superseded
+                     script run stop here)
+        """
+        token = uuid.uuid4().hex
+        deadline = time.time() + timeout
+        acquired, waited = False, False
+        while True:
+            try:
+                acquired = self._acquire(key, token, time.time() + LOCK_LEASE_SECONDS)
+            except Exception:
+                self.errors += 1
+                break
+            if acquired or time.time() > deadline:
+                break
+            waited = True
+            if wait is None:
+                time.sleep(LOCK_POLL_SECONDS)
+            else:
+                wait()
+        if waited:
+            self.lock_waits += 1
+        try:
+            yield
+        finally:
+            if acquired:
+                try:
+                    self._release(key, token)
+                except Exception:
+                    self.errors += 1
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__, "hits": self.hits, "misses": self.misses,
+                "lock_waits": self.lock_waits, "errors": self.errors}
+
+
+class SQLiteCache(SharedCache):
+    """
+    SQLite file in WAL mode; one connection per thread.
+    Locks are rows in a second table, taken with INSERT and expiring with their lease.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        super().__init__(ttl)
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("create table if not exists entries "
+                         "(key text primary key, value blob, created real, expires real)")
+            conn.execute("create table if not exists locks (key text primary key, token text, expires real)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            self._local.conn = conn
+        return conn
+
+    def _get(self, key, now):
+        row = self._conn().execute("select value, created from entries where key = ? and expires > ?",
+                                   (key, now)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def _put(self, key, data, created, expires):
+        conn = self._conn()
+        conn.execute("insert or replace into entries values (?, ?, ?, ?)", (key, data, created, expires))
+        conn.execute("delete from entries where expires <= ?", (time.time(),))
+
+    def _acquire(self, key, token, expires):
+        conn = self._conn()
+        conn.execute("begin immediate")
+        try:
+            conn.execute("delete from locks where key = ? and expires <= ?", (key, time.time()))
+            cur = conn.execute("insert or ignore into locks values (?, ?, ?)", (key, token, expires))
+            conn.execute("commit")
+        except BaseException:
+            conn.execute("rollback")
+            raise
+        return cur.rowcount == 1
+
+    def _release(self, key, token):
+        self._conn().execute("delete from locks where key = ? and token = ?", (key, token))
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("delete from entries")
+
+
+class RedisCache(SharedCache):
+    """
+    Redis keys <prefix>:v:<key> (value, expires with the TTL), <prefix>:c:<key> (created)
+    and <prefix>:l:<key> (lock, SET NX with a lease).
+    """
+
+    # Delete the lock only if we still own it
+    _RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url: str, ttl: float, prefix: str = "daily"):
+        super().__init__(ttl)
+        import redis  # optional dependency, only needed for this backend
+        self.redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _get(self, key, now):
+        data, created = self.redis.mget(f"{self.prefix}:v:{key}", f"{self.prefix}:c:{key}")
+        return (data, float(created)) if data is not None and created is not None else None
+
+    def _put(self, key, data, created, expires):
+        ttl_ms = max(1, int((expires - time.time()) * 1000))
+        pipe = self.redis.pipeline()
+        pipe.set(f"{self.prefix}:v:{key}", data, px=ttl_ms)
+        pipe.set(f"{self.prefix}:c:{key}", repr(created), px=ttl_ms)
+        pipe.execute()
+
+    def _acquire(self, key, token, expires):
+        return bool(self.redis.set(f"{self.prefix}:l:{key}", token, nx=True,
+                                   px=max(1, int((expires - time.time()) * 1000))))
+
+    def _release(self, key, token):
+        self.redis.eval(self._RELEASE, 1, f"{self.prefix}:l:{key}", token)
+
+    def clear(self):
+        for prefix in ("v", "c"):
+            keys = list(self.redis.scan_iter(f"{self.prefix}:{prefix}:*"))
+            if keys:
+                self.redis.delete(*keys)
+
+
+def from_url(url: str, ttl: float) -> Optional[SharedCache]:
+    """
+    Backend for a DAILY_SHARED_CACHE value; None for an empty value.
+    """
+    if not url:
+        return None
+    if url.startswith("sqlite:///"):
+        return SQLiteCache(url[len("sqlite:///"):], ttl)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache(url, ttl)
+    raise ValueError(f"Unsupported DAILY_SHARED_CACHE: {url}")
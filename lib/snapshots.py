@@ -0,0 +1,140 @@
+"""
+Precomputed Overview (KPI row + Top Traders with monthly histories) for the
+formats.date_ranges presets with all assets and durations selected - the view
+most loads ask for. A daemon thread recomputes each preset on its own schedule
+and Overview.render reads the snapshot instead of querying.
+"""
+from __future__ import annotations
+import threading
+import time
+from pathlib import Path
+
+import streamlit as st
+
+from lib import db, formats
+from lib.ltv import ltv_relation
+
+
+# Seconds between recomputations per preset
+SNAPSHOT_INTERVALS = {
+    "Today": 60,
+    "This Week": 3600,
+    "This Month": 3600,
+    "This Year": 3600,
+}
+# How often the worker checks for due presets
+_TICK_SECONDS = 5
+
+
+def overview_queries(start_dt_utc, end_dt_utc, all_assets, all_durations,
+                     sel_asset_ids, sel_duration_ids, preset=None) -> dict[str, tuple]:
+    """
+    The Overview's queries as {name: (sql, params, query_name)}, shared by
+    Overview.render and the snapshot worker so both run exactly the same SQL.
+    Both also cover the previous equivalent period (formats.previous_period of preset).
+    """
+    prev_start_dt_utc, prev_end_dt_utc = formats.previous_utc_range(start_dt_utc, end_dt_utc, preset)
+    filters = {
+        "start": start_dt_utc.date(),
+        "end": end_dt_utc.date(),
+        "prev_start": prev_start_dt_utc.date(),
+        "prev_end": prev_end_dt_utc.date(),
+        "all_assets": all_assets,
+        "all_durations": all_durations,
+        "assets": "','".join(map(str, sel_asset_ids)) or '0',
+        "durations": "','".join(map(str, sel_duration_ids)) or '00:00',
+    }
+    return {
+        "kpi": (Path("queries/overview_kpi.sql").read_text(), filters, None),
+        "top_traders": (Path("queries/top_traders.sql").read_text(), {
+            **filters,
+            "limit_rows": 10,
+            "pnl_threshold": 1000,
+            "ltv_relation": ltv_relation(),
+        }, "top_traders"),
+    }
+
+
+class SnapshotStore:
+    """
+    Latest snapshot per preset: {"dates": (start, end), "computed_at", "kpi", "top_traders"}.
+    Snapshots are replaced whole, never modified, so readers need no lock.
+    """
+
+    def __init__(self):
+        self._snapshots: dict[str, dict] = {}
+        self._due: dict[str, float] = {preset: 0.0 for preset in SNAPSHOT_INTERVALS}
+        self.errors: dict[str, str] = {}
+
+    def lookup(self, preset: str, start_date, end_date) -> dict | None:
+        """
+        Snapshot of preset if computed for exactly these dates (a stale "Today" after
+        midnight won't match). Matched by preset too: presets can share dates (Today and
+        This Month on the 1st) but not the comparison period.
+        """
+        snapshot = self._snapshots.get(preset)
+        return snapshot if snapshot is not None and snapshot["dates"] == (start_date, end_date) else None
+
+    def refresh(self, preset: str):
+        start_date, end_date = formats.preset_date_ranges(formats.local_today())[preset]
+        start_dt, end_dt = formats.utc_range(start_date, end_date)
+        snapshot = {"dates": (start_date, end_date), "computed_at": time.time()}
+        for name, (sql, params, query_name) in overview_queries(start_dt, end_dt, True, True, [], [], preset).items():
+            snapshot[name] = db.fetch_sql(sql, params=params, query_name=query_name)
+        self._snapshots[preset] = snapshot
+
+    def invalidate(self):
+        """
+        Drop every snapshot and make all presets due now; Overview queries live
+        until the worker has recomputed them.
+        """
+        self._snapshots = {}
+        self._due = {preset: 0.0 for preset in SNAPSHOT_INTERVALS}
+
+    def refresh_due(self):
+        now = time.time()
+        for preset, interval in SNAPSHOT_INTERVALS.items():
+            if now < self._due[preset]:
+                continue
+            self._due[preset] = now + interval
+            try:
+                self.refresh(preset)
+                self.errors.pop(preset, None)
+            except Exception as err:
+                self.errors[preset] = str(err)  # keep the previous snapshot; retry next interval
+
+
+def _refresh_loop(store: SnapshotStore):
+    while True:
+        store.refresh_due()
+        time.sleep(_TICK_SECONDS)
+
+@st.cache_resource(show_spinner=False)
+def get_snapshot_store() -> SnapshotStore:
+    """
+    One SnapshotStore per process, filled by a daemon thread (the first Overview
+    loads query live until the first snapshots land).
+    """
+    store = SnapshotStore()
+    threading.Thread(target=_refresh_loop, args=(store,), daemon=True, name="overview-snapshots").start()
+    return store
+
+def invalidate():
+    """
+    Forget all snapshots (the "Refresh Data" button), so no preset shows numbers
+    computed before the refresh.
+    """
+    get_snapshot_store().invalidate()
+
+def lookup(start_dt_utc, end_dt_utc, all_assets, all_durations, preset=None) -> dict | None:
+    """
+    Snapshot for an Overview request, or None if it isn't a precomputed view.
+    :param preset: formats.date_preset of the request (None for a manual range)
+    """
+    if preset not in SNAPSHOT_INTERVALS or not (all_assets and all_durations):
+        return None
+    # Overview's query dates are the .date() of the UTC range, same as in refresh()
+    start_date, end_date = formats.preset_date_ranges(formats.local_today())[preset]
+    if formats.utc_range(start_date, end_date) != (start_dt_utc, end_dt_utc):
+        return None
+    return get_snapshot_store().lookup(preset, start_date, end_date)
@@ -0,0 +1,67 @@
+"""
+Trades chart as a custom component that receives its arrays as binary buffers.
+
+st_echarts / st.plotly_chart send every number as JSON text (~20 bytes per float,
+parsed back in the browser); here each column goes as raw little-endian bytes
+(optionally zlib-compressed) and the frontend views them as typed arrays.
+Frontend: components/tick_chart/index.html (plain JS + canvas, no build step).
+"""
+from __future__ import annotations
+import hashlib
+import zlib
+from pathlib import Path
+
+import numpy as np
+import streamlit.components.v1 as components
+
+from lib import trace
+
+
+_FRONTEND = Path(__file__).resolve().parent.parent / "components" / "tick_chart"
+_component = components.declare_component("tick_chart", path=str(_FRONTEND))
+
+# zlib level: 1 already gets most of the gain on timestamps/prices at a fraction of the time
+COMPRESS_LEVEL = 1
+
+_DTYPES = {"f8": "<f8", "i8": "<i8", "i4": "<i4", "i1": "<i1"}
+
+
+def _pack(values, dtype: str, compress: bool) -> bytes:
+    data = np.ascontiguousarray(values, dtype=_DTYPES[dtype]).tobytes()
+    return zlib.compress(data, COMPRESS_LEVEL) if compress else data
+
+def tick_chart(ts_ms, series: dict, trades: dict, kind: str = "line", colors: dict | None = None,
+               height: int = 520, compress: bool = True, key: str | None = None) -> int:
+    """
+    :param ts_ms: Tick (or bar) times, epoch ms, sorted
+    :param series: {"price": ...} for kind="line", {"open", "high", "low", "close"} for kind="candles"
+    :param trades: {"tt", "tstrike", "ct", "cstrike", "side" (+1 BUY / -1 SELL), "vol", "pnl"}
+    :param colors: {"line", "win", "lose", "neutral", "axis"}
+    :param compress: zlib-compress each buffer (inflated with DecompressionStream in the browser)
+    :return: Payload size in bytes
+    """
+    arrays = {"ts": ("f8", ts_ms)}  # epoch ms are exact in float64, and JS needs Numbers anyway
+    arrays.update({name: ("f8", values) for name, values in series.items()})
+    arrays.update({f"trades_{name}": ("i1" if name == "side" else "f8", values) for name, values in trades.items()})
+
+    with trace.span("tick_chart.pack", points=len(ts_ms), compress=compress):
+        payload = {name: _pack(values, dtype, compress) for name, (dtype, values) in arrays.items()}
+    payload_bytes = sum(map(len, payload.values()))
+
+    digest = hashlib.blake2b(digest_size=8)
+    for buf in payload.values():
+        digest.update(buf)
+
+    _component(
+        kind=kind,
+        arrays={name: dtype for name, (dtype, _) in arrays.items()},
+        compress=compress,
+        height=height,
+        colors=colors or {},
+        payload_bytes=payload_bytes,
+        data_id=digest.hexdigest(),  # lets the frontend keep its zoom when nothing changed
+        key=key,
+        default=None,
+        **payload,
+    )
+    return payload_bytes
@@ -0,0 +1,384 @@
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from lib import db, trace
+from lib.cache import ResultCache
+from lib.folds import OHLCFold
+from queries.filter_lists import assets_list
+from queries.trader_sql import queries
+
+try:
+    import fcntl  # POSIX only; without it writers are only serialized within one process
+except ImportError:
+    fcntl = None
+
+# Local replica of tfc_real_time_data (ticks are immutable once written).
+# Off unless DAILY_TICK_STORE_DIR points at a writable directory.
+TICK_STORE_DIR = os.getenv("DAILY_TICK_STORE_DIR", "")
+# How much history the first sync pulls, and how often the tail is synced
+BACKFILL_DAYS = int(os.getenv("DAILY_TICK_STORE_BACKFILL_DAYS", "30"))
+SYNC_SECONDS = 60
+# Ticks younger than this are left to the warehouse (late arrivals)
+SYNC_LAG = timedelta(minutes=5)
+
+# Bars folded from the local part of a window, per (asset, window, bar size): the
+# ticks behind them never change, so reruns and group paging reuse them
+_local_bars = ResultCache(ttl=600, budget_bytes=64 * 1024 ** 2)
+
+# One raw little-endian file per column and day, appended in timestamp order.
+# SENDER_TIMESTAMP nulls are stored as int64 min, which numpy reads back as NaT.
+_COLUMNS = {"ts": "<i8", "sender": "<i8", "price": "<f8"}
+_NAT = np.iinfo(np.int64).min
+_DAY_MS = 86_400_000
+
+
+def _to_ms(ts) -> int:
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")  # naive warehouse timestamps are UTC
+    return ts.value // 10 ** 6
+
+def _ms_to_dt(ms: int) -> datetime:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+
+class AssetStore:
+    """
+    Day-partitioned tick files of one asset plus its manifest:
+        asset_<id>/manifest.json       {"start_ms", "synced_until_ms", "days": {day: rows}}
+        asset_<id>/<day>.<column>.bin
+    Ticks in [start_ms, synced_until_ms) are all on disk. Row counts in the manifest
+    are authoritative: bytes past them (an interrupted append) are truncated on open,
+    and readers never map beyond them. Appends, truncation and manifest writes happen
+    under an flock on asset_<id>/.lock, so several server processes (or scanner
+    workers) can share the directory; readers need no lock.
+    """
+
+    def __init__(self, root: Path, asset_id: int):
+        self.asset_id = asset_id
+        self.path = root / f"asset_{asset_id}"
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._maps: dict[tuple, np.memmap] = {}
+        with self._file_lock():
+            self.manifest = self._load_manifest()
+
+    def _file(self, day: str, column: str) -> Path:
+        return self.path / f"{day}.{column}.bin"
+
+    @contextmanager
+    def _file_lock(self):
+        """
+        Exclusive lock on the asset's files across processes (and threads: each call
+        opens its own file description).
+        """
+        with open(self.path / ".lock", "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _load_manifest(self) -> dict:
+        """
+        Committed state from disk, with uncommitted bytes cut off. Call under _file_lock.
+        """
+        try:
+            manifest = json.loads((self.path / "manifest.json").read_text())
+        except (OSError, ValueError):
+            return {"start_ms": None, "synced_until_ms": None, "days": {}}
+        for day, rows in manifest["days"].items():
+            self._truncate(day, rows)
+        return manifest
+
+    def _truncate(self, day: str, rows: int):
+        for column, dtype in _COLUMNS.items():
+            f = self._file(day, column)
+            if f.exists() and f.stat().st_size > rows * np.dtype(dtype).itemsize:
+                os.truncate(f, rows * np.dtype(dtype).itemsize)
+
+    def _save_manifest(self, manifest: dict):
+        tmp = self.path / f"manifest.json.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps(manifest))
+        os.replace(tmp, self.path / "manifest.json")
+        with self._lock:
+            self.manifest = manifest
+
+    def append(self, day: str, batch: pd.DataFrame, manifest: dict):
+        """
+        Append a batch (rtd_for_trades schema, sorted by TIMESTAMP) to the day's files.
+        The caller commits the new row counts by saving the manifest.
+        """
+        columns = {
+            "ts": batch["TIMESTAMP_MS"].to_numpy(dtype="int64"),
+            "sender": batch["SENDER_TIMESTAMP_MS"].to_numpy(dtype="int64", na_value=_NAT),
+            "price": batch["PRICE"].to_numpy(dtype="float64"),
+        }
+        for column, dtype in _COLUMNS.items():
+            with open(self._file(day, column), "ab") as f:
+                f.write(columns[column].astype(dtype, copy=False).tobytes())
+        manifest["days"][day] = manifest["days"].get(day, 0) + len(batch)
+
+    def _map(self, day: str, column: str, rows: int) -> np.ndarray:
+        if rows == 0:
+            return np.empty(0, dtype=_COLUMNS[column])
+        key = (day, column, rows)
+        arr = self._maps.get(key)
+        if arr is None:
+            arr = np.memmap(self._file(day, column), dtype=_COLUMNS[column], mode="r", shape=(rows,))
+            self._maps = {k: v for k, v in self._maps.items() if k[:2] != (day, column)}
+            self._maps[key] = arr
+        return arr
+
+    def covers(self, start_ms: int) -> bool:
+        manifest = self.manifest
+        return manifest["start_ms"] is not None and manifest["start_ms"] <= start_ms
+
+    def slice(self, start_ms: int, end_ms: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Ticks with start_ms <= ts <= end_ms; the caller keeps end_ms below synced_until_ms.
+        Views into the mapped files when the range falls in one day.
+        """
+        with self._lock:
+            manifest = self.manifest
+        parts = []
+        day_ms = start_ms - start_ms % _DAY_MS
+        while day_ms <= end_ms:
+            day = _ms_to_dt(day_ms).strftime("%Y-%m-%d")
+            rows = manifest["days"].get(day, 0)
+            ts = self._map(day, "ts", rows)
+            lo = int(np.searchsorted(ts, start_ms, side="left"))
+            hi = int(np.searchsorted(ts, end_ms, side="right"))
+            if hi > lo:
+                parts.append(tuple(self._map(day, c, rows)[lo:hi] for c in _COLUMNS))
+            day_ms += _DAY_MS
+        if not parts:
+            return tuple(np.empty(0, dtype=dtype) for dtype in _COLUMNS.values())
+        if len(parts) == 1:
+            return parts[0]
+        return tuple(np.concatenate(cols) for cols in zip(*parts))
+
+    def sync(self, until_ms: int, backfill_ms: int):
+        """
+        Pull [synced_until_ms, until_ms) from the warehouse one day at a time,
+        streaming each day in batches (db.iter_sql) and committing it in the manifest.
+        Each day is pulled under the file lock, starting from the manifest on disk, so
+        a day another process synced meanwhile is not pulled (or appended) twice.
+        """
+        while self._sync_day(until_ms, backfill_ms):
+            pass
+
+    def _sync_day(self, until_ms: int, backfill_ms: int) -> bool:
+        """
+        :return: False once synced up to until_ms
+        """
+        with self._file_lock():
+            manifest = self._load_manifest()
+            if manifest["synced_until_ms"] is None:
+                start_ms = backfill_ms - backfill_ms % _DAY_MS
+                manifest.update(start_ms=start_ms, synced_until_ms=start_ms)
+            if manifest["synced_until_ms"] >= until_ms:
+                with self._lock:
+                    self.manifest = manifest
+                return False
+
+            from_ms = manifest["synced_until_ms"]
+            to_ms = min(until_ms, from_ms - from_ms % _DAY_MS + _DAY_MS)
+            day = _ms_to_dt(from_ms).strftime("%Y-%m-%d")
+            committed_rows = manifest["days"].get(day, 0)
+            last_ts = None
+            try:
+                for batch in db.iter_sql(queries["rtd_sync"],
+                                         params={"asset_id": self.asset_id,
+                                                 "from_ts": _ms_to_dt(from_ms), "to_ts": _ms_to_dt(to_ms)},
+                                         query_name="rtd_for_trades"):
+                    if batch.empty:
+                        continue
+                    # the query is ordered; a batch that isn't (or overlaps the previous one) means
+                    # the order was lost somewhere, and appending it would break searchsorted
+                    ts = batch["TIMESTAMP_MS"].to_numpy()
+                    if (np.diff(ts) < 0).any() or (last_ts is not None and ts[0] < last_ts):
+                        raise RuntimeError(f"Unordered tick batch for asset {self.asset_id} on {day}")
+                    self.append(day, batch, manifest)
+                    last_ts = ts[-1]
+            except BaseException:
+                self._truncate(day, committed_rows)  # drop the uncommitted part of the day
+                raise
+            manifest["synced_until_ms"] = to_ms
+            self._save_manifest(manifest)
+            return True
+
+
+class TickStore:
+    """
+    Local, memory-mapped replica of tfc_real_time_data, one AssetStore per asset.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.assets: dict[int, AssetStore] = {}
+        self.synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def asset(self, asset_id: int) -> AssetStore:
+        with self._lock:
+            store = self.assets.get(asset_id)
+            if store is None:
+                store = self.assets[asset_id] = AssetStore(self.root, asset_id)
+        return store
+
+    def sync(self, asset_ids):
+        now = datetime.now(timezone.utc)
+        until_ms = _to_ms(now - SYNC_LAG)
+        backfill_ms = _to_ms(now - timedelta(days=BACKFILL_DAYS))
+        for asset_id in asset_ids:
+            with trace.span("tick_store.sync", asset_id=asset_id):
+                self.asset(int(asset_id)).sync(until_ms, backfill_ms)
+        self.synced_at = time.time()
+
+    def stats(self) -> dict:
+        return {
+            asset_id: {
+                "rows": sum(store.manifest["days"].values()),
+                "synced_until": _ms_to_dt(store.manifest["synced_until_ms"]) if store.manifest["synced_until_ms"] else None,
+            }
+            for asset_id, store in self.assets.items()
+        }
+
+
+def _frame(asset_id: int, ts: np.ndarray, sender: np.ndarray, price: np.ndarray) -> pd.DataFrame:
+    """
+    Columns and dtypes exactly as read_sql returns rtd_for_trades (after apply_schema).
+    """
+    df = pd.DataFrame({
+        "ASSET_ID": np.full(len(ts), asset_id, dtype=np.int32),
+        "TIMESTAMP": pd.to_datetime(ts.view("M8[ms]").astype("M8[ns]"), utc=True),
+        "SENDER_TIMESTAMP": pd.to_datetime(sender.view("M8[ms]").astype("M8[ns]"), utc=True),
+        "PRICE": price,
+    })
+    df["TIMESTAMP_MS"] = ts
+    df["SENDER_TIMESTAMP_MS"] = db.to_epoch_ms(df["SENDER_TIMESTAMP"])
+    return df
+
+@trace.traced("tick_store.read_ticks")
+def read_ticks(asset_id: int, start_ts, end_ts) -> pd.DataFrame:
+    """
+    rtd_for_trades for one asset and window: the synced part comes from the local
+    store (binary search + slice), only the unsynced tail from the warehouse.
+    Falls back to read_sql for the whole window when the store is off or doesn't
+    reach back to start_ts.
+    """
+    params = {"asset_id": asset_id, "start_ts": start_ts, "end_ts": end_ts}
+    store = get_tick_store()
+    asset = store.asset(int(asset_id)) if store is not None else None
+    start_ms, end_ms = _to_ms(start_ts), _to_ms(end_ts)
+    if asset is None or not asset.covers(start_ms):
+        return db.read_sql(queries["rtd_for_trades"], params=params, query_name="rtd_for_trades")
+
+    synced_until_ms = asset.manifest["synced_until_ms"]
+    local = _frame(int(asset_id), *asset.slice(start_ms, min(end_ms, synced_until_ms - 1)))
+    if end_ms < synced_until_ms:
+        return local
+
+    tail = db.read_sql(queries["rtd_for_trades"], params={**params, "start_ts": _ms_to_dt(synced_until_ms)},
+                       query_name="rtd_for_trades")
+    if "BAR_TS" in tail.columns:
+        # the governor degraded the tail to bars; bars and ticks don't mix
+        return db.read_sql(queries["rtd_for_trades"], params=params, query_name="rtd_for_trades")
+    if tail.empty:
+        return local
+    ticks = pd.concat([local, tail], ignore_index=True)
+    ticks.attrs["fetched_at"] = tail.attrs.get("fetched_at")  # db.result_stamp: the tail is what changes
+    return ticks
+
+@trace.traced("tick_store.read_bars")
+def read_bars(asset_id: int, start_ts, end_ts, bar_seconds: int) -> pd.DataFrame:
+    """
+    rtd_bars_for_trades for one asset and window. When the store covers start_ts the
+    bars are folded (folds.OHLCFold) from the local ticks one day at a time - cached
+    per window in _local_bars - and the unsynced tail is read with read_sql (cached,
+    governed, cancelled with its run) and folded on top. Otherwise, or when the
+    governor degraded the tail, the warehouse aggregates the whole window.
+    """
+    params = {"asset_id": asset_id, "start_ts": start_ts, "end_ts": end_ts}
+    bars_params = {**params, "bar_seconds": bar_seconds}
+    store = get_tick_store()
+    asset = store.asset(int(asset_id)) if store is not None else None
+    start_ms, end_ms = _to_ms(start_ts), _to_ms(end_ts)
+    if asset is None or not asset.covers(start_ms):
+        return db.read_sql(queries["rtd_bars_for_trades"], params=bars_params, query_name="rtd_bars_for_trades")
+
+    synced_until_ms = asset.manifest["synced_until_ms"]
+    local = _fold_local_bars(asset, start_ms, min(end_ms, synced_until_ms - 1), bar_seconds)
+    if end_ms < synced_until_ms:
+        return local.copy(deep=False)
+
+    tail = db.read_sql(queries["rtd_for_trades"], params={**params, "start_ts": _ms_to_dt(synced_until_ms)},
+                       query_name="rtd_for_trades")
+    if "BAR_TS" in tail.columns:
+        # the governor degraded the tail to its own bar size; let the warehouse do the window
+        return db.read_sql(queries["rtd_bars_for_trades"], params=bars_params, query_name="rtd_bars_for_trades")
+    fold = OHLCFold(bar_seconds)
+    fold.add_bars(local.set_index("BAR_TS")[["OPEN", "HIGH", "LOW", "CLOSE", "NUM_TICKS"]])
+    fold.add(tail)
+    bars = fold.result()
+    bars.insert(0, "ASSET_ID", int(asset_id))
+    bars = db.apply_schema(bars, "rtd_bars_for_trades")
+    bars.attrs["fetched_at"] = tail.attrs.get("fetched_at")  # db.result_stamp: the tail is what changes
+    return bars
+
+def _fold_local_bars(asset: AssetStore, start_ms: int, end_ms: int, bar_seconds: int) -> pd.DataFrame:
+    """
+    Bars of the asset's local ticks in [start_ms, end_ms] (end_ms below synced_until_ms),
+    folded a day at a time and cached in _local_bars. Don't modify the result in place.
+    """
+    key = (asset.asset_id, start_ms, end_ms, bar_seconds)
+    bars = _local_bars.get(key)
+    if bars is None:
+        fold = OHLCFold(bar_seconds)
+        day_ms = start_ms - start_ms % _DAY_MS
+        while day_ms <= end_ms:
+            fold.add(_frame(asset.asset_id, *asset.slice(max(start_ms, day_ms), min(end_ms, day_ms + _DAY_MS - 1))))
+            day_ms += _DAY_MS
+        bars = fold.result()
+        bars.insert(0, "ASSET_ID", asset.asset_id)
+        bars = db.apply_schema(bars, "rtd_bars_for_trades")
+        bars.attrs["fetched_at"] = time.time()  # db.result_stamp; the ticks behind them don't change
+        _local_bars.put(key, bars)
+    return bars
+
+
+def _sync_loop(store: TickStore):
+    while True:
+        try:
+            store.sync(db.fetch_sql(assets_list)["ASSET_ID"].astype(int))
+        except Exception:
+            pass  # keep serving what is on disk; try again next round
+        time.sleep(SYNC_SECONDS)
+
+@st.cache_resource(show_spinner=False)
+def get_tick_store() -> TickStore | None:
+    """
+    One TickStore per process, synced by a daemon thread; None when disabled.
+    """
+    if not TICK_STORE_DIR:
+        return None
+    try:
+        store = TickStore(Path(TICK_STORE_DIR))
+    except OSError:
+        return None  # read-only file system (e.g. SiS)
+    threading.Thread(target=_sync_loop, args=(store,), daemon=True, name="tick-store-sync").start()
+    return store
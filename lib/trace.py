@@ -0,0 +1,138 @@
+from __future__ import annotations
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+# Tracing is on for every run with DAILY_TRACE=1, or per page with ?trace=1
+TRACE_ENV_ENABLED = os.getenv("DAILY_TRACE", "") not in ("", "0")
+TRACE_DIR = Path(os.getenv("DAILY_TRACE_DIR", "traces"))
+# Trace files kept per session and in total; older ones are deleted as new ones are written
+TRACE_KEEP_PER_SESSION = int(os.getenv("DAILY_TRACE_KEEP", "50"))
+TRACE_KEEP_TOTAL = 20 * TRACE_KEEP_PER_SESSION
+
+# Each Streamlit session runs its script on its own thread, so spans of one rerun
+# are collected per thread. events is None while tracing is off.
+_local = threading.local()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        events = getattr(_local, "events", None)
+        if events is not None:
+            events.append({
+                "name": self.name,
+                "cat": self.name.split(".")[0],
+                "ph": "X",
+                "ts": (self.start - _local.t0) / 1000,  # Chrome trace wants microseconds
+                "dur": (end - self.start) / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": self.args,
+            })
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def requested(query_params) -> bool:
+    return TRACE_ENV_ENABLED or query_params.get("trace", "0") not in ("", "0")
+
+def begin_run(enabled: bool):
+    """
+    Start collecting spans for this rerun (or stop, if not enabled).
+    """
+    _local.events = [] if enabled else None
+    _local.t0 = time.perf_counter_ns()
+    _local.started = datetime.now()
+
+def enabled() -> bool:
+    return getattr(_local, "events", None) is not None
+
+def span(name: str, **args):
+    """
+    Context manager timing a block: `with trace.span("db.query", query_name=...):`
+    Costs one attribute lookup when tracing is off.
+    """
+    if getattr(_local, "events", None) is None:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+def traced(name: str | None = None):
+    """
+    Decorator version of span; the span name defaults to module.function.
+    """
+    def decorator(fn):
+        span_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if getattr(_local, "events", None) is None:
+                return fn(*args, **kwargs)
+            with _Span(span_name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def end_run(session_id: str = "local") -> dict | None:
+    """
+    Finish the rerun: write its spans as Chrome trace / Perfetto JSON into TRACE_DIR.
+    :return: The trace dict (None if tracing was off)
+    """
+    events = getattr(_local, "events", None)
+    if events is None:
+        return None
+    _local.events = None
+
+    trace = {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"session": session_id, "started": _local.started.isoformat()},
+    }
+    try:
+        TRACE_DIR.mkdir(parents=True, exist_ok=True)
+        path = TRACE_DIR / f"trace_{_local.started:%Y%m%d_%H%M%S_%f}_{session_id[:8]}.json"
+        path.write_text(json.dumps(trace, default=str))
+        _rotate(session_id[:8])
+    except OSError:
+        pass  # read-only file system (e.g. SiS): the trace is still returned
+    return trace
+
+def _rotate(session_tag: str):
+    """
+    Delete all but the newest TRACE_KEEP_PER_SESSION files of this session and the
+    newest TRACE_KEEP_TOTAL overall (names start with the run's start time, so they sort by age).
+    """
+    for pattern, keep in ((f"trace_*_{session_tag}.json", TRACE_KEEP_PER_SESSION),
+                          ("trace_*.json", TRACE_KEEP_TOTAL)):
+        for old in sorted(TRACE_DIR.glob(pattern))[:-keep]:
+            try:
+                old.unlink()
+            except OSError:
+                pass  # removed by another session's rotation
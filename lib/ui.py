@@ -1,5 +1,8 @@
+import pandas as pd
 import streamlit as st
 
+from lib import db, memory
+
 def kpi_row(df):
     col1, col2, col3, col4, col5 = st.columns(5)
     if df is None or df.empty:
@@ -17,3 +20,55 @@ def kpi_row(df):
     col3.metric("Total Profit", f"${vals[3]:,.0f}")
     col4.metric("Trading Volume", f"${vals[2]:,.0f}")
     col5.metric("Margin", f"{vals[4]:.2f}%")
+
+
+def memory_panel():
+    """
+    Records this session's state size and shows memory usage of the process:
+    cached query results, session state per session, and the shared budget.
+    """
+    sizes = memory.record_session(memory.current_session_id(), st.session_state.to_dict())
+    stats = db.cache_stats()
+    q_stats = db.query_stats()
+    sessions = memory.sessions()
+    sessions_bytes = sum(s["bytes"] for s in sessions.values())
+
+    mb = 1024 ** 2
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Cached Results", f"{stats['bytes'] / mb:,.1f} MB", f"{stats['entries']} entries",
+                delta_color="off")
+    col2.metric("Session State", f"{sessions_bytes / mb:,.1f} MB", f"{len(sessions)} sessions",
+                delta_color="off")
+    col3.metric("Budget Used", f"{(stats['bytes'] + sessions_bytes) / stats['budget_bytes']:.0%}",
+                f"of {stats['budget_bytes'] / mb:,.0f} MB", delta_color="off")
+    col4.metric("Cache Hits / Misses / Evictions",
+                f"{stats['hits']} / {stats['misses']} / {stats['evictions']}")
+    col5.metric("Warehouse Queries", f"{q_stats['executions']:,}",
+                f"{q_stats['coalesced']:,} coalesced, {q_stats['shared_hits']:,} from shared cache, "
+                f"{q_stats['cancelled']:,} cancelled",
+                delta_color="off")
+    if "shared" in q_stats:
+        shared = q_stats["shared"]
+        st.caption(f"Shared cache ({shared['backend']}): {shared['hits']} hits, {shared['misses']} misses, "
+                   f"{shared['lock_waits']} lock waits, {shared['errors']} errors")
+
+    st.write("This session")
+    st.dataframe(
+        pd.DataFrame(sorted(sizes.items(), key=lambda kv: -kv[1]), columns=["key", "bytes"]),
+        hide_index=True,
+    )
+    st.write("Cached results")
+    st.dataframe(
+        pd.DataFrame(db.cache_entries(), columns=["key", "bytes", "hits", "age_s", "idle_s"])
+        .assign(key=lambda df: df["key"].map(lambda k: " ".join(str(k[0]).split())[:120]))
+        .sort_values("bytes", ascending=False),
+        hide_index=True,
+    )
+    st.write("Sessions")
+    st.dataframe(
+        pd.DataFrame(
+            [(sid, s["bytes"], len(s["keys"])) for sid, s in sessions.items()],
+            columns=["session", "bytes", "keys"],
+        ).sort_values("bytes", ascending=False),
+        hide_index=True,
+    )
@@ -1,10 +1,11 @@
+import json
 import streamlit as st
-from datetime import datetime, timedelta, date, time
+from datetime import date
 
 
-from manual_pages import Overview, Trader
-from lib import formats, multiselect
-from lib import db
+from manual_pages import Overview, Scanner, Trader
+from lib import formats, multiselect, ui
+from lib import db, memory, snapshots, trace
 from queries.filter_lists import assets_list, durations_list
 
 
@@ -29,17 +30,23 @@ qp = st.query_params
 url_requested_trader = qp.get("trader_id", "44554")
 url_requested_page = qp.get("page", "Overview")
 
+# Profiling spans for this rerun (DAILY_TRACE=1 or ?trace=1)
+trace.begin_run(trace.requested(qp))
+# Cancel warehouse queries the previous run of this session left running
+db.begin_run()
+
 # Get values for filters
-df_assets = db.read_sql(assets_list)
-assets = (
-    dict(zip(df_assets["ASSET_ID"], df_assets["ASSET_NAME"]))
-    if not df_assets.empty else formats.assets
-)
-st.session_state["assets_dict"] = assets
-asset_id_options = list(assets.keys())
+with trace.span("main.filter_lists"):
+    df_assets = db.read_sql(assets_list)
+    assets = (
+        dict(zip(df_assets["ASSET_ID"], df_assets["ASSET_NAME"]))
+        if not df_assets.empty else formats.assets
+    )
+    st.session_state["assets_dict"] = assets
+    asset_id_options = list(assets.keys())
 
-df_durations = db.read_sql(durations_list)
-durations = df_durations["DURATION"].tolist() if not df_durations.empty else formats.durations
+    df_durations = db.read_sql(durations_list)
+    durations = df_durations["DURATION"].tolist() if not df_durations.empty else formats.durations
 
 # ===============================
 # SIDEBAR NAVIGATION
@@ -61,21 +68,27 @@ if page != url_requested_page:  # user clicked a new section
 
 st.sidebar.subheader("Filters")
 
+def apply_date_preset():
+    # A keyed date_input ignores later changes of its value=, so a preset is written into its state
+    st.session_state.date_input = tuple(formats.preset_date_ranges(formats.local_today())[st.session_state.selected_range])
+
 # Quick date-range dropdown
 st.sidebar.selectbox(
     "Quick Date Range",
     options=list(formats.date_ranges.keys()),
     key="selected_range",
-    index=0  # default to the first one, e.g., "Today"
+    index=0,  # default to the first one, e.g., "Today"
+    on_change=apply_date_preset
 )
 
 # Set start_date and end_date based on the selected range
-start_date, end_date = formats.date_ranges[st.session_state.selected_range]
+start_date, end_date = formats.preset_date_ranges(formats.local_today())[st.session_state.selected_range]
+if "date_input" not in st.session_state:
+    st.session_state.date_input = (start_date, end_date)
 
 # Date range picker
 picked_date = st.sidebar.date_input(
     "Manual Date Range",
-    value=(start_date, end_date),
     min_value=date(2013, 1, 1),
     max_value=date(2030, 12, 31),
     key="date_input"
@@ -83,8 +96,7 @@ picked_date = st.sidebar.date_input(
 if isinstance(picked_date, tuple) and len(picked_date) == 2:
     start_date, end_date = picked_date
 
-start_dt = datetime.combine(start_date, time.min) - timedelta(hours=2)
-end_dt = datetime.combine(end_date, time.max) - timedelta(hours=2)
+start_dt, end_dt = formats.utc_range(start_date, end_date)
 
 # Game type selector = duration + asset (independent multiselects)
 sel_durations, all_durations = multiselect.multi_with_all(
@@ -103,20 +115,39 @@ st.sidebar.write("---")
 
 if st.sidebar.button("Refresh Data"):
     st.cache_data.clear()
+    db.clear_cache()
+    snapshots.invalidate()
+    Trader.clear_chart_cache()
     st.session_state.clear()
     st.rerun()
 
 if page == "Overview":
     Overview.render(
         start_dt, end_dt, 
-        all_assets, all_durations, sel_asset_ids, sel_durations
+        all_assets, all_durations, sel_asset_ids, sel_durations,
+        preset=formats.date_preset(st.session_state.selected_range, start_date, end_date)
     )
 elif page == "Trader":
     Trader.render(
         start_dt, end_dt, 
         url_requested_trader
     )
+elif page == "Scanner":
+    Scanner.render(
+        start_dt, end_dt,
+        all_assets, sel_asset_ids
+    )
+
+run_trace = trace.end_run(memory.current_session_id())
 
+# Memory usage instead of dumping the whole session state on every rerun
 with st.expander("END"):
-    st.write(st.session_state)
+    ui.memory_panel()
+    if run_trace:
+        st.download_button(
+            "Download rerun trace (chrome://tracing / ui.perfetto.dev)",
+            json.dumps(run_trace, default=str),
+            file_name="trace.json",
+            mime="application/json",
+        )
 
@@ -1,12 +1,13 @@
 import streamlit as st
-from pathlib import Path
+import pandas as pd
+from datetime import datetime
 import plotly.graph_objects as go
 
 
+from lib import snapshots, trace
 from lib.db import read_sql
 from lib.formats import colors_context
 # from lib.ui import kpi_row
-from queries.overview_sql import queries
 
 
 def trader_link(tid):
@@ -88,57 +89,66 @@ def _show_trader_history(trader_data_orig, start_dt_utc, end_dt_utc):
 
     st.plotly_chart(fig, use_container_width=True)
 
+def _rank_movement(rank, prev_rank) -> str:
+    """
+    Leaderboard movement vs the previous period, as colored markdown
+    """
+    if pd.isna(prev_rank):
+        return ":blue[new]"
+    moved = int(prev_rank) - int(rank)
+    if moved > 0:
+        return f":green[▲{moved}]"
+    if moved < 0:
+        return f":red[▼{-moved}]"
+    return ":gray[=]"
+
+@trace.traced("Overview.render")
 def render(start_dt_utc, end_dt_utc, all_assets, all_durations,
-           sel_asset_ids, sel_duration_ids):
+           sel_asset_ids, sel_duration_ids, preset=None):
     st.title("Trading Platform Overview")
 
-    # KPI Query
-    sql_kpi = Path("queries/overview_kpi.sql").read_text()
-    
-    sql_kpi_params = {
-        "start": start_dt_utc.date(),
-        "end": end_dt_utc.date(),
-        "all_assets": all_assets,
-        "all_durations": all_durations,
-        "assets": "','".join(map(str, sel_asset_ids)) or '0',
-        "durations": "','".join(map(str, sel_duration_ids)) or '00:00'
-    }
-    df_kpi = read_sql(sql_kpi, params=sql_kpi_params)
+    # Date presets with everything selected come precomputed (lib.snapshots)
+    snapshot = snapshots.lookup(start_dt_utc, end_dt_utc, all_assets, all_durations, preset)
+    if snapshot is not None:
+        st.caption(f"Snapshot from {datetime.fromtimestamp(snapshot['computed_at']):%H:%M:%S}")
+        df_kpi = snapshot["kpi"].copy(deep=False)
+        df_top_traders = snapshot["top_traders"].copy(deep=False)
+    else:
+        overview_queries = snapshots.overview_queries(start_dt_utc, end_dt_utc, all_assets, all_durations,
+                                                      sel_asset_ids, sel_duration_ids, preset)
+        sql_kpi, sql_kpi_params, _ = overview_queries["kpi"]
+        df_kpi = read_sql(sql_kpi, params=sql_kpi_params)
+        sql_top_traders, sql_top_traders_params, _ = overview_queries["top_traders"]
+        df_top_traders = read_sql(sql_top_traders, params=sql_top_traders_params, query_name="top_traders")
 
     # kpi_row(df_kpi)
 
+    # Deltas are against the previous equivalent period (PREV_ columns, same scan)
     col1, col2, col3, col4, col5 = st.columns([30, 30, 40, 40, 20])
     if df_kpi is not None and not df_kpi.empty:
-        col1.metric("Total Trades", f"{df_kpi.loc[0, 'NUM_TRADES']:,.0f}")
-        col2.metric("Total Traders", f"{df_kpi.loc[0, 'NUM_TRADERS']:,.0f}")
-        col3.metric("Total Profit", f"¥{df_kpi.loc[0, 'SITE_PROFITS']:,.0f}")
-        col4.metric("Trading Volume", f"¥{df_kpi.loc[0, 'SITE_VOLUME']:,.0f}")
-        col5.metric("Margin", f"{df_kpi.loc[0, 'MARGIN']:.2f}%")
+        kpi = df_kpi.loc[0]
+        col1.metric("Total Trades", f"{kpi['NUM_TRADES']:,.0f}",
+                    f"{kpi['NUM_TRADES'] - kpi['PREV_NUM_TRADES']:+,.0f}")
+        col2.metric("Total Traders", f"{kpi['NUM_TRADERS']:,.0f}",
+                    f"{kpi['NUM_TRADERS'] - kpi['PREV_NUM_TRADERS']:+,.0f}")
+        col3.metric("Total Profit", f"¥{kpi['SITE_PROFITS']:,.0f}",
+                    f"¥{kpi['SITE_PROFITS'] - kpi['PREV_SITE_PROFITS']:+,.0f}")
+        col4.metric("Trading Volume", f"¥{kpi['SITE_VOLUME']:,.0f}",
+                    f"¥{kpi['SITE_VOLUME'] - kpi['PREV_SITE_VOLUME']:+,.0f}")
+        col5.metric("Margin", f"{kpi['MARGIN']:.2f}%", f"{kpi['MARGIN'] - kpi['PREV_MARGIN']:+.2f}%")
 
     # Top Traders
-    sql_top_traders = Path("queries/top_traders.sql").read_text()
-
-    sql_top_traders_params = {
-        "limit_rows": 10,
-        "pnl_threshold": 1000,
-        "start": start_dt_utc.date(),
-        "end": end_dt_utc.date(),
-        "all_assets": all_assets,
-        "all_durations": all_durations,
-        "assets": "','".join(map(str, sel_asset_ids)) or '0',
-        "durations": "','".join(map(str, sel_duration_ids)) or '00:00'       
-    }
-    
-    df_top_traders = read_sql(sql_top_traders, params=sql_top_traders_params)
     df_prominents = df_top_traders[['PLAYER_NAME', 'PLAYER_ID', 'VOL', 'TRADER_PNL',
-                                    'NUM_TRADES', 'LTV', 'NOTES']].drop_duplicates()
+                                    'NUM_TRADES', 'LTV', 'NOTES', 'TRADER_RANK', 'PREV_RANK']].drop_duplicates()
 
     st.subheader("Top Traders")
-    c1, c2, c3, c4, c5, c6, c7 = st.columns([20, 20, 20, 20, 20, 20, 50])
-    _ = (c1.write("Username"), c2.write("Player ID"), c3.write("Num Trades"),
+    c0, c1, c2, c3, c4, c5, c6, c7 = st.columns([12, 20, 20, 20, 20, 20, 20, 50])
+    _ = (c0.write("Rank"), c1.write("Username"), c2.write("Player ID"), c3.write("Num Trades"),
          c4.write("Total Profit"), c5.write("Total Volume")), c6.write("LTV")
     for _, row in df_prominents.iterrows():
-        c1, c2, c3, c4, c5, c6, c7 = st.columns([20, 20, 20, 20, 20, 20, 50], vertical_alignment='center', gap="small")
+        c0, c1, c2, c3, c4, c5, c6, c7 = st.columns([12, 20, 20, 20, 20, 20, 20, 50], vertical_alignment='center', gap="small")
+
+        c0.markdown(f"{row['TRADER_RANK']} {_rank_movement(row['TRADER_RANK'], row['PREV_RANK'])}")
 
         with c1:
             # trader_link(row["PLAYER_ID"])
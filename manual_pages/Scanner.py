@@ -0,0 +1,68 @@
+import streamlit as st
+from datetime import datetime
+
+
+from lib import scanner, trace
+
+
+@trace.traced("Scanner.render")
+def render(start_dt_utc: datetime, end_dt_utc: datetime, all_assets, sel_asset_ids):
+    """
+    Constructs content of the page Scanner: latency-arbitrage ranking of all traders
+    :param start_dt_utc: Start of the period of interest
+    :param end_dt_utc: End of the period of interest
+    :param all_assets: 1 if no asset filter is applied
+    :param sel_asset_ids: Selected asset IDs
+    :return:
+    """
+    st.title("Latency Arbitrage Scanner")
+    st.caption(
+        f"Every trade is compared with the tick in force at entry. An entry is stale when that tick is "
+        f"older than {scanner.STALE_TICK_MS} ms or the feed lagged more than {scanner.FEED_LAG_MS} ms. "
+        f"Only traders with at least {scanner.MIN_TRADES} trades are ranked."
+    )
+
+    scan_key = (start_dt_utc, end_dt_utc, all_assets, tuple(sel_asset_ids))
+    if st.button("Run scan", type="primary"):
+        parts = scanner.partitions(start_dt_utc, end_dt_utc, all_assets, sel_asset_ids)
+        progress = st.progress(0.0, text=f"Scanning {len(parts)} asset-day partition(s)...")
+        with trace.span("Scanner.scan", partitions=len(parts)):
+            ranked = scanner.scan(
+                parts,
+                on_progress=lambda done, total: progress.progress(done / total, text=f"{done} / {total} partitions"),
+            )
+        progress.empty()
+        st.session_state["scanner_result"] = (scan_key, ranked)
+
+    result = st.session_state.get("scanner_result")
+    if result is None or result[0] != scan_key:
+        st.info("Pick the date range and assets in the sidebar, then run the scan.")
+        return
+
+    ranked = result[1]
+    if ranked.empty:
+        st.info("No trader has enough trades in the selected range.")
+        return
+
+    ranked = ranked.assign(TRADER=ranked["TRADER_ID"].map(lambda tid: f"?page=Trader&trader_id={tid}"))
+    st.dataframe(
+        ranked[["TRADER", "SCORE", "TRADES", "WIN_RATE", "PROFIT", "POS_EDGE_SHARE", "POS_EDGE_WIN_RATE",
+                "STALE_SHARE", "STALE_WIN_RATE", "FRESH_WIN_RATE", "STALE_PROFIT", "AVG_ENTRY_EDGE",
+                "AVG_FEED_LAG_MS"]],
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "TRADER": st.column_config.LinkColumn("Trader", display_text=r"trader_id=(\d+)"),
+            "SCORE": st.column_config.NumberColumn("Score", format="%.3f"),
+            "WIN_RATE": st.column_config.NumberColumn("Win rate", format="percent"),
+            "PROFIT": st.column_config.NumberColumn("Profit", format="%.0f"),
+            "POS_EDGE_SHARE": st.column_config.NumberColumn("In-the-money entries", format="percent"),
+            "POS_EDGE_WIN_RATE": st.column_config.NumberColumn("ITM entry win rate", format="percent"),
+            "STALE_SHARE": st.column_config.NumberColumn("Stale entries", format="percent"),
+            "STALE_WIN_RATE": st.column_config.NumberColumn("Stale win rate", format="percent"),
+            "FRESH_WIN_RATE": st.column_config.NumberColumn("Fresh win rate", format="percent"),
+            "STALE_PROFIT": st.column_config.NumberColumn("Stale-entry profit", format="%.0f"),
+            "AVG_ENTRY_EDGE": st.column_config.NumberColumn("Avg entry edge", format="%.5f"),
+            "AVG_FEED_LAG_MS": st.column_config.NumberColumn("Avg feed lag (ms)", format="%.0f"),
+        },
+    )
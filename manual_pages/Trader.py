@@ -6,51 +6,146 @@ from datetime import datetime, timedelta
 import pyarrow.lib
 
 
-from lib.db import read_sql
+from lib import memory, trace
+from lib.db import read_sql, result_stamp
+from lib.execution_quality import ENTRY_LOOKBACK_SECONDS, enrich_trades
 from lib.formats import colors_context
+from lib.ltv import ltv_relation
+from lib.tick_store import read_bars, read_ticks
 from queries.trader_sql import queries
 
 
+# Group windows longer than this are fetched as OHLC bars aggregated in the warehouse
+OHLC_WINDOW_THRESHOLD = timedelta(minutes=30)
+# Candidate bar sizes (seconds); the smallest one giving <= OHLC_TARGET_BARS bars wins
+OHLC_BAR_SECONDS = [1, 5, 15, 30, 60, 300, 900, 1800, 3600, 4 * 3600, 24 * 3600]
+OHLC_TARGET_BARS = 300
+# Plotly price line switches from SVG Scatter to WebGL Scattergl above this many points
+PLOTLY_GL_THRESHOLD = 5000
+# Cached Plotly figures are rebuilt at least this often (seconds)
+FIGURE_CACHE_TTL = 300
+# Grouping gap slider: range and starting value (seconds)
+GROUPING_GAP_RANGE = (1, 3600)
+GROUPING_GAP_DEFAULT = 60
+# Log-spaced bins of the gap histogram
+GAP_HISTOGRAM_BINS = 40
+
+
+@trace.traced("Trader.render")
 def render(start_dt_utc: datetime, end_dt_utc: datetime, selected_trader: str):
     """
     Constructs content of the page Trader
     :param start_dt_utc: Start of the period of interest
     :param end_dt_utc: End of the period of interest
-    :param selected_trader: Trader ID as text. Later will add support for Username
+    :param selected_trader: Trader ID, email or username as text (resolved via the player index)
     :return:
     """
     st.title("Trader Detail Overview")
     if "keep_elements" not in st.session_state:
         st.session_state.keep_elements = []
 
-    trader_id = st.text_input(
+    trader_query = st.text_input(
         "Enter Trader ID, Email, or Username",
         value=selected_trader
     )
-    if not trader_id:
+    if not trader_query:
         st.info("Please enter a trader to view details.")
         return
 
-    sql_profile = Path("queries/trader_profile.sql").read_text()
-    sql_profile = sql_profile.format(
-        trader_id=trader_id,
-        start=start_dt_utc.date(),
-        end=end_dt_utc.date()
-    )
-    df_profile = read_sql(sql_profile)
+    trader_id = _resolve_trader(trader_query)
+    if trader_id is None:
+        return
+
+    df_profile = get_profile(start_dt_utc, end_dt_utc, trader_id)
 
     st.dataframe(df_profile, use_container_width=True)
 
     if st.button("Show All Trades"):
-        show_trades(start_dt_utc, end_dt_utc, selected_trader)
+        show_trades(start_dt_utc, end_dt_utc, trader_id)
 
     if st.button("Show Trades on Graph") or "Trades Chart" in st.session_state.keep_elements:
-        st.session_state.keep_elements.append("Trades Chart")
-        plot_trades(start_dt_utc, end_dt_utc, selected_trader)
+        if "Trades Chart" not in st.session_state.keep_elements:
+            st.session_state.keep_elements.append("Trades Chart")
+        plot_trades(start_dt_utc, end_dt_utc, trader_id)
+
+def _resolve_trader(trader_query: str) -> int | None:
+    """
+    Turns the text typed by the user into a player ID using the in-memory player index.
+    A numeric ID passes straight through; otherwise one match is taken as is and
+    several matches are offered in a selectbox.
+    :param trader_query: ID, email or username (or a prefix/part of them)
+    :return: Player ID, or None if nothing matches
+    """
+    trader_query = trader_query.strip()
+    try:
+        from lib.player_index import get_player_index
+        index = get_player_index()
+    except Exception as err:
+        index = None
+        st.caption(f"Player search unavailable ({err}); only Trader IDs are supported.")
+
+    # Numeric input is an ID even when the index doesn't know it yet (players created
+    # since its last refresh); digits must not fall through to a username search
+    if trader_query.isdigit():
+        return int(trader_query)
+    if index is None:
+        st.warning("Please enter a numeric Trader ID.")
+        return None
+
+    matches = index.search(trader_query, limit=20)
+    if matches.empty:
+        st.warning(f"No trader matches '{trader_query}'.")
+        return None
+    if len(matches) == 1:
+        return int(matches["PLAYER_ID"].iloc[0])
+
+    labels = {
+        int(row.PLAYER_ID): f"{row.PLAYER_ID} • {row.USERNAME} • {row.EMAIL}"
+        for row in matches.itertuples()
+    }
+    return st.selectbox(f"{len(matches)} matching traders", options=list(labels),
+                        format_func=labels.get)
 
 def show_trades(start_dt_utc, end_dt_utc, selected_trader):
+    trades = get_enriched_trades(start_dt_utc, end_dt_utc, selected_trader)
+    if trades.empty:
+        st.dataframe(trades)
+        return
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Avg entry edge", f"{trades['ENTRY_EDGE'].mean():.5f}")
+    c2.metric("Entries on stale tick (>1s)", f"{(trades['ENTRY_TICK_AGE_MS'] > 1000).mean():.1%}")
+    c3.metric("Median feed lag at entry", f"{trades['ENTRY_FEED_LAG_MS'].median():,.0f} ms")
+    c4.metric("Avg MFE / MAE", f"{trades['MFE'].mean():.5f} / {trades['MAE'].mean():.5f}")
+    st.dataframe(trades.drop(columns=[c for c in trades.columns if c.endswith("_MS") and c[:-3] in trades.columns]),
+                 hide_index=True)
+
+def get_profile(start_dt_utc, end_dt_utc, selected_trader):
+    sql_profile = Path("queries/trader_profile.sql").read_text()
+    sql_profile = sql_profile.format(
+        trader_id=selected_trader,
+        start=start_dt_utc.date(),
+        end=end_dt_utc.date(),
+        ltv_relation=ltv_relation()
+    )
+    return read_sql(sql_profile)
+
+def get_enriched_trades(start_dt_utc, end_dt_utc, selected_trader):
+    """
+    get_trades with the execution quality of every trade against the ticks around
+    it (lib.execution_quality); empty when there are no trades.
+    """
     trades = get_trades(start_dt_utc, end_dt_utc, selected_trader)
-    st.dataframe(trades)
+    if trades.empty:
+        return trades
+    ticks = read_sql(queries["trade_window_ticks"], params={
+        "trader_id": selected_trader,
+        "start_time": start_dt_utc,
+        "end_time": end_dt_utc,
+        "lookback_seconds": ENTRY_LOOKBACK_SECONDS,
+    }, query_name="trade_window_ticks")
+    with trace.span("Trader.enrich_trades", trades=len(trades), ticks=len(ticks)):
+        return enrich_trades(trades, ticks)
 
 def get_trades(start_dt_utc, end_dt_utc, selected_trader):
     all_trades_sql = queries['all_trades']
@@ -59,41 +154,107 @@ def get_trades(start_dt_utc, end_dt_utc, selected_trader):
         "start_time": start_dt_utc,
         "end_time": end_dt_utc
     }
-    trades = read_sql(all_trades_sql, params=all_trades_sql_params)
+    trades = read_sql(all_trades_sql, params=all_trades_sql_params, query_name="all_trades")
     return trades
 
+@trace.traced("Trader.plot_trades")
 def plot_trades(start_dt_utc, end_dt_utc, selected_trader,
-                grouping_gap_threshold=60, engine='plotly'):
-    trades =  get_trades(start_dt_utc, end_dt_utc, selected_trader)
-    if trades.empty:
+                grouping_gap_threshold=GROUPING_GAP_DEFAULT, engine='plotly',
+                ohlc_threshold=OHLC_WINDOW_THRESHOLD):
+    if not load_trade_gaps(st.session_state, start_dt_utc, end_dt_utc, selected_trader):
         st.info("No trades found for the selected filters.")
         return
 
-    trade_groups = _group_trades(
-        trades=trades,
-        grouping_gap_threshold=timedelta(seconds=grouping_gap_threshold)
-    )
-    num_trade_groups = trade_groups["group_label"].max()
-    st.caption(f"Found {num_trade_groups} trade group(s). Grouping margin: {grouping_gap_threshold}s.")
-
-    idx_key = "trade_group__idx"
-    if idx_key not in st.session_state:
-        st.session_state[idx_key] = 1
+    _trades_chart_fragment(start_dt_utc, end_dt_utc, selected_trader,
+                           grouping_gap_threshold, engine, ohlc_threshold)
 
-    cur_group = trade_groups.loc[trade_groups["group_label"] == st.session_state[idx_key]]
+def load_trade_gaps(state, start_dt_utc, end_dt_utc, selected_trader) -> bool:
+    """
+    Fetch the trades and keep them, sorted and with their gaps, in state["trade_gaps"]:
+    the grouping for any gap threshold is derived from them in memory, so neither group
+    navigation nor the gap slider (fragment reruns) re-fetch or re-sort. Keyed on the
+    fetch too (db.result_stamp), so a re-fetched result with new trades is regrouped.
+    :param state: st.session_state (or a dict standing in for it, see bench.load_test)
+    :return: False when there are no trades
+    """
+    trades = get_trades(start_dt_utc, end_dt_utc, selected_trader)
+    if trades.empty:
+        return False
+    gaps_key = (selected_trader, start_dt_utc, end_dt_utc, result_stamp(trades))
+    cached = state.get("trade_gaps")
+    if cached is None or cached[0] != gaps_key:
+        state["trade_gaps"] = (gaps_key, _trade_gaps(trades))
+    return True
+
+def load_group(trade_gaps: dict, group_idx: int, grouping_gap_threshold: float,
+               ohlc_threshold: timedelta = OHLC_WINDOW_THRESHOLD) -> dict:
+    """
+    One trade group and the price data of its window, fetched lazily. Windows longer
+    than ohlc_threshold come back as OHLC bars.
+    :param trade_gaps: From _trade_gaps
+    :param group_idx: 1-based group number at grouping_gap_threshold
+    :return: {"trades", "asset_id", "from", "to", "ticks", "bars", "bar_seconds"}
+             (bar_seconds is None when the governor picked the bar size)
+    """
+    labels = _group_labels(trade_gaps, grouping_gap_threshold)
+    cur_group = trade_gaps["trades"].loc[labels == group_idx]
     asset_id = int(cur_group["ASSET_ID"].unique().squeeze())  # ToDo: do we need to check it's unique?
 
     g_from = cur_group["TRADING_TIME"].min() - timedelta(seconds=grouping_gap_threshold)
     g_to = cur_group["CLOSE_TIME"].max() + timedelta(seconds=grouping_gap_threshold)
 
-    # ---- Fetch ticks for this group (lazy)
-    ticks_sql = queries["rtd_for_trades"]
-    ticks_sql_params = {
-        "asset_id": asset_id,
-        "start_ts": g_from,
-        "end_ts": g_to
-    }
-    ticks = read_sql(ticks_sql, params=ticks_sql_params)
+    use_bars = (g_to - g_from) > ohlc_threshold
+    bar_seconds = None
+    if use_bars:
+        bar_seconds = _pick_bar_seconds(g_to - g_from)
+        # bars and raw ticks come from the local replica when it is enabled (lib.tick_store)
+        ticks = read_bars(asset_id, g_from, g_to, bar_seconds)
+    else:
+        ticks = read_ticks(asset_id, g_from, g_to)
+    # The query cost governor may have turned a raw tick request into bars
+    if not use_bars and "BAR_TS" in ticks.columns:
+        use_bars = True
+    return {"trades": cur_group, "asset_id": asset_id, "from": g_from, "to": g_to,
+            "ticks": ticks, "bars": use_bars, "bar_seconds": bar_seconds}
+
+@st.fragment
+def _trades_chart_fragment(start_dt_utc, end_dt_utc, selected_trader,
+                           grouping_gap_threshold, engine, ohlc_threshold):
+    """
+    Gap slider + chart + group navigator + group table. The slider and Prev/Next/Group #
+    rerun only this fragment: the sidebar, the Overview and the profile query are not touched.
+    """
+    own_trace = not trace.enabled()  # fragment reruns don't pass through main.py
+    if own_trace:
+        trace.begin_run(trace.requested(st.query_params))
+    try:
+        with trace.span("Trader.trades_chart_fragment"):
+            _trades_chart(start_dt_utc, end_dt_utc, selected_trader,
+                          grouping_gap_threshold, engine, ohlc_threshold)
+    finally:
+        if own_trace:
+            trace.end_run(memory.current_session_id())
+
+def _trades_chart(start_dt_utc, end_dt_utc, selected_trader,
+                  grouping_gap_threshold, engine, ohlc_threshold):
+    _, trade_gaps = st.session_state["trade_gaps"]
+    grouping_gap_threshold = st.slider(
+        "Grouping gap (s)", *GROUPING_GAP_RANGE, value=grouping_gap_threshold, key="trade_group_gap",
+        help="Trades of the same asset less than this far apart are shown together",
+    )
+    num_trade_groups = _group_count(trade_gaps, grouping_gap_threshold)
+    st.caption(f"Found {num_trade_groups} trade group(s). Grouping margin: {grouping_gap_threshold}s.")
+    with st.expander("Gap distribution"):
+        _build_gap_histogram(trade_gaps, grouping_gap_threshold)
+
+    idx_key = "trade_group__idx"
+    if idx_key not in st.session_state or st.session_state[idx_key] > num_trade_groups:
+        st.session_state[idx_key] = 1
+
+    # ---- Fetch ticks for this group (lazy). Long windows come back as OHLC bars
+    group = load_group(trade_gaps, st.session_state[idx_key], grouping_gap_threshold, ohlc_threshold)
+    cur_group, asset_id, g_from, g_to = group["trades"], group["asset_id"], group["from"], group["to"]
+    ticks, use_bars, bar_seconds = group["ticks"], group["bars"], group["bar_seconds"]
 
     st.markdown(
         f"Group {st.session_state[idx_key]} / {num_trade_groups} &nbsp;&nbsp; "
@@ -102,65 +263,68 @@ def plot_trades(start_dt_utc, end_dt_utc, selected_trader,
         f"• &nbsp;&nbsp; {cur_group.shape[0]} Trade(s) &nbsp;&nbsp; "
         f"• &nbsp;&nbsp; Investment {cur_group['VOLUME'].sum().astype(int):,} &nbsp;&nbsp; "
         f"• &nbsp;&nbsp; Profit {cur_group['PROFIT'].sum().astype(int):,} "
+        + (f"&nbsp;&nbsp; • &nbsp;&nbsp; {f'{bar_seconds}s' if bar_seconds else 'OHLC'} bars" if use_bars else "")
     )
 
-    _build_trades_chart(cur_group, ticks, engine)
+    engine = st.segmented_control("Chart engine", ["plotly", "echarts", "binary"], default=engine,
+                                  key="chart_engine", label_visibility="collapsed") or engine
+    chart_key = (selected_trader, start_dt_utc, end_dt_utc, st.session_state[idx_key],
+                 grouping_gap_threshold, st.context.theme.type, result_stamp(cur_group), result_stamp(ticks))
+    _build_trades_chart(cur_group, ticks, engine, bars=use_bars, cache_key=chart_key)
 
-    _build_group_controls(idx_key, num_trade_groups)
+    with trace.span("st.group_controls"):
+        _build_group_controls(idx_key, num_trade_groups)
 
     # Optional: table + download for the group
     with st.expander("Show trades in this group"):
-        if not trades.empty:
-            st.dataframe(trades[["SIDE","TRADING_TIME","TRADING_STRIKE","CLOSE_TIME","CLOSE_STRIKE",
-                                 "VOLUME","PROFIT","DURATION","ASSET_ID"]], use_container_width=True, hide_index=True)
+        if not cur_group.empty:
+            st.dataframe(cur_group[["SIDE","TRADING_TIME","TRADING_STRIKE","CLOSE_TIME","CLOSE_STRIKE",
+                                    "VOLUME","PROFIT","DURATION","ASSET_ID"]], use_container_width=True, hide_index=True)
             st.download_button(
                 "Download CSV",
-                trades.to_csv(index=False).encode("utf-8"),
+                cur_group.to_csv(index=False).encode("utf-8"),
                 file_name=f"trader_{-1}_asset_{-1}_group_{-1}.csv",
                 mime="text/csv"
             )
         else:
             st.write("No trades in this group.")
 
-def _to_iso(s: pd.Series) -> pd.Series:
-    # ensure naive UTC ISO strings
-    s = pd.to_datetime(s, utc=True).dt.tz_convert("UTC").dt.tz_localize(None)
-    return s.dt.strftime("%Y-%m-%dT%H:%M:%S")
-
-def _to_epoch_ms(s: pd.Series) -> pd.Series:
-    # pandas datetime -> int64 ns -> int ms (Python ints for JSON)
-    ms = (pd.to_datetime(s, utc=True).astype("int64") // 10 ** 6)
-    # ensure Python int, not numpy int64 (better for JSON)
-    return ms.astype("int64").map(int)
-
-def _to_dt_from_ms(ms: pd.Series) -> pd.Series:
-    # epoch ms -> pandas datetime (UTC, tz-naive for Plotly)
-    return pd.to_datetime(ms, unit="ms", utc=True).dt.tz_convert("UTC").dt.tz_localize(None)
+def _pick_bar_seconds(window: timedelta) -> int:
+    """
+    Smallest bar size that keeps the window under OHLC_TARGET_BARS bars
+    :param window: Length of the visible window
+    :return: Bar size in seconds
+    """
+    for bar_seconds in OHLC_BAR_SECONDS:
+        if window.total_seconds() / bar_seconds <= OHLC_TARGET_BARS:
+            return bar_seconds
+    return OHLC_BAR_SECONDS[-1]
 
-def _prep_for_plotly_chart(trades: pd.DataFrame, ticks: pd.DataFrame):
+@trace.traced("chart.prep_plotly")
+def _prep_for_plotly_chart(trades: pd.DataFrame, ticks: pd.DataFrame, bars: bool = False):
     """
+    Times are the epoch-ms columns added at ingestion (*_MS); Plotly date axes take them as is.
     Returns:
-        ticks_dt  : DataFrame [TIMESTAMP, PRICE] (datetime)
+        ticks_dt  : DataFrame [TIMESTAMP_MS, PRICE],
+                    or [BAR_TS_MS, OPEN, HIGH, LOW, CLOSE] when bars=True
         trades_dt : DataFrame with columns:
-                  "TRADING_TIME","TRADING_STRIKE","CLOSE_TIME","CLOSE_STRIKE",
+                  "TRADING_TIME_MS","TRADING_STRIKE","CLOSE_TIME_MS","CLOSE_STRIKE",
                   "SIDE","VOLUME","PROFIT","DURATION","ASSET_ID","SIZE","COLOR",OPEN_MARKER
     """
-    ticks_dt = pd.DataFrame(columns=["TIMESTAMP","PRICE"])
-    if not ticks.empty:
-        ticks_dt = ticks.copy()
-        ticks_dt["PRICE"] = ticks_dt["PRICE"].astype(float)
-        ticks_dt["PRICE"] = pd.to_numeric(ticks_dt["PRICE"], errors="coerce")
-        ticks_dt = ticks_dt[["TIMESTAMP", "PRICE"]].sort_values("TIMESTAMP").reset_index()
-
-    trades_dt = pd.DataFrame(columns=["TRADING_TIME","TRADING_STRIKE","CLOSE_TIME","CLOSE_STRIKE",
+    ticks_dt = pd.DataFrame(columns=["TIMESTAMP_MS","PRICE"])
+    if bars:
+        ticks_dt = pd.DataFrame(columns=["BAR_TS_MS", "OPEN", "HIGH", "LOW", "CLOSE"])
+        if not ticks.empty:
+            ticks_dt = ticks[["BAR_TS_MS", "OPEN", "HIGH", "LOW", "CLOSE"]].sort_values("BAR_TS_MS").reset_index(drop=True)
+    elif not ticks.empty:
+        # dtypes are already compact/numeric (lib.db.SCHEMAS["rtd_for_trades"])
+        ticks_dt = ticks[["TIMESTAMP_MS", "PRICE"]].sort_values("TIMESTAMP_MS").reset_index()
+
+    trades_dt = pd.DataFrame(columns=["TRADING_TIME_MS","TRADING_STRIKE","CLOSE_TIME_MS","CLOSE_STRIKE",
                                       "SIDE","VOLUME","PROFIT","DURATION","ASSET_ID","SIZE","COLOR"])
     if not trades.empty:
-        # numerics & fields
+        # numerics are already cast at ingestion (lib.db.SCHEMAS["all_trades"])
         trades_dt = trades.copy()
-        trades_dt["TRADING_STRIKE"] = trades_dt["TRADING_STRIKE"].astype(float)
-        trades_dt["CLOSE_STRIKE"] = trades_dt["CLOSE_STRIKE"].astype(float)
-        trades_dt["VOLUME"] = trades_dt["VOLUME"].astype(float)
-        trades_dt["PROFIT"] = trades_dt["PROFIT"].astype(float)
 
         # size by volume (1,000 -> 14, 200,000 -> 70)
         trades_dt["SIZE"] = 10 + 4 * np.sqrt(trades_dt["VOLUME"] / 1000)
@@ -174,81 +338,162 @@ def _prep_for_plotly_chart(trades: pd.DataFrame, ticks: pd.DataFrame):
                                    np.where(trades_dt["SIDE"].astype(str).str.upper().eq("SELL"),
                                             "triangle-down-dot", "circle-dot"))
 
-        trades_dt = trades_dt.sort_values(["TRADING_TIME", "CLOSE_TIME"])
-
-        for col in ["TRADING_STRIKE", "CLOSE_STRIKE", "VOLUME", "PROFIT", "ASSET_ID", "SIZE"]:
-            trades_dt[col] = pd.to_numeric(trades_dt[col], errors="coerce")
+        trades_dt = trades_dt.sort_values(["TRADING_TIME_MS", "CLOSE_TIME_MS"])
 
     return trades_dt, ticks_dt
 
-def _prep_for_echarts_chart(trades: pd.DataFrame, ticks: pd.DataFrame):
+@trace.traced("chart.prep_echarts")
+def _prep_for_echarts_chart(trades: pd.DataFrame, ticks: pd.DataFrame, bars: bool = False):
     """
     Prepare datasets for ECharts (use array order to carry extra fields to tooltip)
+    Times are the epoch-ms columns added at ingestion (*_MS), no conversion needed.
     Returns:
-        ticks_dt  : DataFrame [TIMESTAMP, PRICE]
+        ticks_dt  : DataFrame [TIMESTAMP_MS, PRICE],
+                    or [BAR_TS_MS, OPEN, CLOSE, LOW, HIGH] (ECharts candlestick order) when bars=True
         trades_dt : DataFrame with columns:
-                  "TRADING_TIME","TRADING_STRIKE","CLOSE_TIME","CLOSE_STRIKE",
+                  "TRADING_TIME_MS","TRADING_STRIKE","CLOSE_TIME_MS","CLOSE_STRIKE",
                   "SIDE","VOLUME","PROFIT","DURATION","ASSET_ID","color"
     """
     ds_ticks, ds_trades = [], []
-    if not ticks.empty:
-        ticks = ticks.sort_values("TIMESTAMP").reset_index()
-        for col_name in ["TIMESTAMP", "SENDER_TIMESTAMP"]:
-            ticks[col_name] = _to_epoch_ms(ticks[col_name])
-        ticks["PRICE"] = ticks["PRICE"].astype(float)
-        ds_ticks = ticks[["TIMESTAMP", "PRICE"]].values.tolist()
+    if bars and not ticks.empty:
+        ticks = ticks.sort_values("BAR_TS_MS")
+        ds_ticks = ticks[["BAR_TS_MS", "OPEN", "CLOSE", "LOW", "HIGH"]].values.tolist()
+    elif not ticks.empty:
+        ticks = ticks.sort_values("TIMESTAMP_MS")
+        ds_ticks = ticks[["TIMESTAMP_MS", "PRICE"]].values.tolist()
 
     if not trades.empty:
-        # times
-        trades = trades.sort_values("TRADING_TIME")
-        for col_name in ["TRADING_TIME", "CLOSE_TIME"]:
-            trades[col_name] = _to_epoch_ms(trades[col_name])
-
-        # numerics
-        trades["TRADING_STRIKE"] = trades["TRADING_STRIKE"].astype(float)
-        trades["CLOSE_STRIKE"] = trades["CLOSE_STRIKE"].astype(float)
-        trades["VOLUME"] = trades["VOLUME"].astype(float)
-        trades["PROFIT"] = trades["PROFIT"].astype(float)
+        trades = trades.sort_values("TRADING_TIME_MS")
         trades["color"] = 'green'
         trades.loc[trades["SIDE"] == "SELL", "color"] = 'red'
 
-        ds_trades = trades[["TRADING_TIME","TRADING_STRIKE","CLOSE_TIME","CLOSE_STRIKE",
+        ds_trades = trades[["TRADING_TIME_MS","TRADING_STRIKE","CLOSE_TIME_MS","CLOSE_STRIKE",
                             "SIDE","VOLUME","PROFIT","DURATION","ASSET_ID","color"]].values.tolist()
 
     return ds_trades, ds_ticks
 
-def _build_trades_chart(trades: pd.DataFrame, ticks: pd.DataFrame, engine):
+def _build_trades_chart(trades: pd.DataFrame, ticks: pd.DataFrame, engine, bars: bool = False,
+                        cache_key: tuple | None = None):
     """
-    Constructs the actual graph. Switch to use ECharts / Plotly / other
+    Constructs the actual graph. Switch to use ECharts / Plotly / binary (lib.tick_chart)
     :param trades: DataFrame with trades (columns: )
-    :param ticks: DataFrame with all prices (columns: )
-    :param engine: ECharts or Plotly
+    :param ticks: DataFrame with all prices (columns: ), or OHLC bars when bars=True
+    :param engine: ECharts, Plotly or binary (typed-array transport, for very large tick sets)
+    :param bars: ticks hold OHLC bars -> draw candlesticks instead of the price line
+    :param cache_key: identifies the group shown (trader, range, group, threshold, theme)
+                      and the data it was fetched as (db.result_stamp of trades and ticks);
+                      Plotly figures are built once per key
     :return:
     """
     if engine.lower() == "plotly":
         try:
-            _build_chart_plotly(trades, ticks)
+            _build_chart_plotly(trades, ticks, bars, cache_key)
         except pyarrow.lib.ArrowInvalid as err:
             st.write(f"PyArrow Error: {err}")
 
+    elif engine.lower() == "binary":
+        _build_chart_binary(trades, ticks, bars)
+
     else:
-        _build_chart_echarts(trades, ticks)
+        _build_chart_echarts(trades, ticks, bars)
 
-def _build_chart_plotly(trades: pd.DataFrame, ticks: pd.DataFrame):
-    import plotly.graph_objects as go
+@trace.traced("chart.build_binary")
+def _build_chart_binary(trades: pd.DataFrame, ticks: pd.DataFrame, bars: bool = False):
+    """
+    Ticks and trades go to the browser as typed binary arrays (lib.tick_chart) instead of JSON
+    """
+    from lib.tick_chart import tick_chart
 
-    trades_dt, ticks_dt = _prep_for_plotly_chart(trades, ticks)
+    if bars:
+        ticks = ticks.sort_values("BAR_TS_MS")
+        ts = ticks["BAR_TS_MS"].to_numpy()
+        series = {col.lower(): ticks[col].to_numpy() for col in ["OPEN", "HIGH", "LOW", "CLOSE"]}
+    else:
+        ticks = ticks.sort_values("TIMESTAMP_MS")
+        ts = ticks["TIMESTAMP_MS"].to_numpy()
+        series = {"price": ticks["PRICE"].to_numpy()}
+
+    trades = trades.sort_values("TRADING_TIME_MS")
+    side = trades["SIDE"].astype(str).str.upper()
+    trade_arrays = {
+        "tt": trades["TRADING_TIME_MS"].to_numpy(),
+        "tstrike": trades["TRADING_STRIKE"].to_numpy(),
+        "ct": trades["CLOSE_TIME_MS"].to_numpy(),
+        "cstrike": trades["CLOSE_STRIKE"].to_numpy(),
+        "side": np.where(side.eq("BUY"), 1, np.where(side.eq("SELL"), -1, 0)),
+        "vol": trades["VOLUME"].to_numpy(),
+        "pnl": trades["PROFIT"].to_numpy(),
+    }
+    colors = {
+        "line": colors_context["normal line"],
+        "win": colors_context["win"],
+        "lose": colors_context["lose"],
+        "neutral": "#1976d2",
+        "axis": colors_context["normal line"],
+    }
+    payload_bytes = tick_chart(ts, series, trade_arrays, kind="candles" if bars else "line",
+                               colors=colors, key="trades_chart_binary")
+    st.caption(f"{len(ts):,} {'bars' if bars else 'ticks'} sent as {payload_bytes / 1024:,.0f} KB of binary arrays")
 
+@trace.traced("chart.build_plotly")
+def _build_chart_plotly(trades: pd.DataFrame, ticks: pd.DataFrame, bars: bool = False,
+                        cache_key: tuple | None = None):
     with st.expander('Sample Data'):
-        st.write("Trades rows:", trades_dt.shape[0], "example:", trades_dt.head())
-        st.write("Ticks rows:", ticks_dt.shape[0], "example:", ticks_dt.head())
+        st.write("Trades rows:", trades.shape[0], "example:", trades.head())
+        st.write("Ticks rows:", ticks.shape[0], "example:", ticks.head())
+
+    if cache_key is None:
+        fig = _make_plotly_figure(trades, ticks, bars)
+    else:
+        fig = _cached_plotly_figure(cache_key, bars, trades, ticks)
+
+    with trace.span("st.plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
+
+@st.cache_resource(max_entries=64, ttl=FIGURE_CACHE_TTL, show_spinner=False)
+def _cached_plotly_figure(cache_key: tuple, bars: bool, _trades: pd.DataFrame, _ticks: pd.DataFrame):
+    """
+    Figure per group, shared across reruns and sessions (keyed on cache_key/bars only).
+    st.plotly_chart derives its JSON from a Figure, so the Figure itself is what gets cached.
+    """
+    return _make_plotly_figure(_trades, _ticks, bars)
+
+def clear_chart_cache():
+    """
+    Drop the cached Plotly figures (the "Refresh Data" button).
+    """
+    _cached_plotly_figure.clear()
+
+@trace.traced("chart.make_plotly_figure")
+def _make_plotly_figure(trades: pd.DataFrame, ticks: pd.DataFrame, bars: bool = False):
+    import plotly.graph_objects as go
+
+    trades_dt, ticks_dt = _prep_for_plotly_chart(trades, ticks, bars)
+
+    # Large tick series go to WebGL; the range slider can't draw GL traces and
+    # would only duplicate the series, so it is dropped in that mode
+    use_gl = not bars and ticks_dt.shape[0] > PLOTLY_GL_THRESHOLD
+    price_trace = go.Scattergl if use_gl else go.Scatter
 
     fig = go.Figure()
 
+    # Price candles (long windows)
+    if bars and not ticks_dt.empty:
+        fig.add_trace(go.Candlestick(
+            x=ticks_dt["BAR_TS_MS"].values,
+            open=ticks_dt["OPEN"].values,
+            high=ticks_dt["HIGH"].values,
+            low=ticks_dt["LOW"].values,
+            close=ticks_dt["CLOSE"].values,
+            name="Price",
+            increasing_line_color=colors_context["win"],
+            decreasing_line_color=colors_context["lose"],
+        ))
+
     # Price line
-    if not ticks_dt.empty:
-        fig.add_trace(go.Scatter(
-            x=ticks_dt["TIMESTAMP"],
+    elif not ticks_dt.empty:
+        fig.add_trace(price_trace(
+            x=ticks_dt["TIMESTAMP_MS"].values,
             y=ticks_dt["PRICE"].values,
             mode="lines",
             name="Price",
@@ -259,7 +504,7 @@ def _build_chart_plotly(trades: pd.DataFrame, ticks: pd.DataFrame):
     if not trades_dt.empty:
         # Open markers
         fig.add_trace(go.Scatter(
-            x=trades_dt["TRADING_TIME"],
+            x=trades_dt["TRADING_TIME_MS"].values,
             y=trades_dt["TRADING_STRIKE"].values,
             mode="markers", name="Open",
             marker=dict(color=trades_dt["COLOR"],
@@ -271,7 +516,7 @@ def _build_chart_plotly(trades: pd.DataFrame, ticks: pd.DataFrame):
                         symbol=trades_dt["OPEN_MARKER"].values),
             customdata=np.stack([
                 trades_dt["SIDE"], trades_dt["VOLUME"], trades_dt["PROFIT"],
-                trades_dt["DURATION"], trades_dt["ASSET_ID"], trades_dt["CLOSE_TIME"], trades_dt["CLOSE_STRIKE"]
+                trades_dt["DURATION"], trades_dt["ASSET_ID"], trades_dt["CLOSE_TIME_MS"], trades_dt["CLOSE_STRIKE"]
             ], axis=1),
             hovertemplate=(
                 "Open %{x|%Y-%m-%d %H:%M:%S.%3f}"
@@ -285,7 +530,7 @@ def _build_chart_plotly(trades: pd.DataFrame, ticks: pd.DataFrame):
 
         # Close markers (triangle)
         fig.add_trace(go.Scatter(
-            x=trades_dt["CLOSE_TIME"],
+            x=trades_dt["CLOSE_TIME_MS"].values,
             y=trades_dt["CLOSE_STRIKE"].values,
             mode="markers", name="Close",
             marker=dict(color=trades_dt["COLOR"],
@@ -295,7 +540,7 @@ def _build_chart_plotly(trades: pd.DataFrame, ticks: pd.DataFrame):
                         symbol="circle-dot"),
             customdata=np.stack([
                 trades_dt["SIDE"], trades_dt["VOLUME"], trades_dt["PROFIT"],
-                trades_dt["DURATION"], trades_dt["ASSET_ID"], trades_dt["TRADING_TIME"], trades_dt["TRADING_STRIKE"]
+                trades_dt["DURATION"], trades_dt["ASSET_ID"], trades_dt["TRADING_TIME_MS"], trades_dt["TRADING_STRIKE"]
             ], axis=1),
             hovertemplate=(
                 "Close %{x|%Y-%m-%d %H:%M:%S.%3f}"
@@ -315,9 +560,10 @@ def _build_chart_plotly(trades: pd.DataFrame, ticks: pd.DataFrame):
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0.02),
         xaxis=dict(
             title=None,
+            type="date",  # x values are epoch ms
             showspikes=True,
             spikemode="across",
-            rangeslider=dict(visible=True),
+            rangeslider=dict(visible=not use_gl),
             tickformat="%Y-%m-%d %H:%M:%S.%3f",  # millisecond labels
             tickformatstops=[
                 dict(dtickrange=[None, 1000], value="%H:%M:%S.%3f"),
@@ -327,19 +573,44 @@ def _build_chart_plotly(trades: pd.DataFrame, ticks: pd.DataFrame):
         ),
         yaxis=dict(title=None, showspikes=True, spikemode="toaxis+across"),
     )
+    return fig
 
-    st.plotly_chart(fig, use_container_width=True)
-
-def _build_chart_echarts(trades: pd.DataFrame, ticks: pd.DataFrame):
+@trace.traced("chart.build_echarts")
+def _build_chart_echarts(trades: pd.DataFrame, ticks: pd.DataFrame, bars: bool = False):
     """
     Constructs the actual graph with ECharts
     :param trades: DataFrame with trades (columns: )
-    :param ticks: DataFrame with all prices (columns: )
+    :param ticks: DataFrame with all prices (columns: ), or OHLC bars when bars=True
+    :param bars: draw candlesticks instead of the price line
     :return:
     """
     from streamlit_echarts import st_echarts
 
-    ds_trades, ds_ticks = _prep_for_echarts_chart(trades, ticks)
+    ds_trades, ds_ticks = _prep_for_echarts_chart(trades, ticks, bars)
+
+    if bars:
+        price_dataset = {"id": "ticks", "source": ds_ticks, "dimensions": ["ts", "open", "close", "low", "high"]}
+        price_series = {
+            "name": "Price",
+            "type": "candlestick",
+            "datasetIndex": 0,
+            "encode": {"x": "ts", "y": ["open", "close", "low", "high"]},
+            "itemStyle": {
+                "color": colors_context["win"], "borderColor": colors_context["win"],
+                "color0": colors_context["lose"], "borderColor0": colors_context["lose"],
+            },
+        }
+    else:
+        price_dataset = {"id": "ticks", "source": ds_ticks, "dimensions": ["ts","price"]}
+        price_series = {
+            "name": "Price",
+            "type": "line",
+            "datasetIndex": 0,
+            "encode": {"x": "ts", "y": "price"},
+            "symbol": "none",
+            "step": "start",
+            "lineStyle": {"width": 1},
+        }
 
     option = {
         "animation": False,
@@ -365,19 +636,11 @@ def _build_chart_echarts(trades: pd.DataFrame, ticks: pd.DataFrame):
             {"type": "value", "scale": True, "axisLabel": {"formatter": "{value}"}},
         ],
         "dataset": [
-            {"id": "ticks", "source": ds_ticks, "dimensions": ["ts","price"]},
+            price_dataset,
             {"id": "trades", "source": ds_trades, "dimensions": ["tt","tstrike","ct","cstrike","side","vol","pnl","dur","asset"]},
         ],
         "series": [
-            {
-                "name": "Price",
-                "type": "line",
-                "datasetIndex": 0,
-                "encode": {"x": "ts", "y": "price"},
-                "symbol": "none",
-                "step": "start",
-                "lineStyle": {"width": 1},
-            },
+            price_series,
             {   # open markers
                 "name": "Open",
                 "type": "scatter",
@@ -477,7 +740,8 @@ def _build_chart_echarts(trades: pd.DataFrame, ticks: pd.DataFrame):
         st.write("Ticks rows:", len(ds_ticks), "example:", ds_ticks[:2])
 
     # ev = st_echarts_event(option, events=events, height="420px", key=f"trade_group_chart")
-    ev = st_echarts(option, events=events, height="420px", key="tg_chart")
+    with trace.span("st.echarts"):
+        ev = st_echarts(option, events=events, height="420px", key="tg_chart")
     if isinstance(ev, dict) and ev.get("type") == "click":
         st.write("Clicked:", ev)  # handle your click here
 
@@ -500,46 +764,78 @@ def _build_group_controls(idx_key: str, num_trade_groups: int):
     except:
         page_width = 1000
 
+    def _step(delta: int):
+        # on_click runs before the fragment reruns, so the chart shows the new group right away
+        st.session_state[idx_key] += delta
+
     _, prev_col, val_col, next_col, __ = st.columns([((1.2*page_width)-400), 200, 400, 200, ((1.2*page_width)-400)], width=page_width)
     with prev_col:
-        if st.button("◀ Prev", disabled=st.session_state[idx_key] <= 1, key="trade_group_prev"):
-            st.session_state[idx_key] -= 1
+        st.button("◀ Prev", disabled=st.session_state[idx_key] <= 1, key="trade_group_prev",
+                  on_click=_step, args=(-1,))
     with next_col:
-        if st.button("Next ▶", disabled=st.session_state[idx_key] >= int(num_trade_groups), key="trade_group_next"):
-            st.session_state[idx_key] += 1
+        st.button("Next ▶", disabled=st.session_state[idx_key] >= int(num_trade_groups), key="trade_group_next",
+                  on_click=_step, args=(1,))
     with val_col:
         st.number_input(
             "Group #", min_value=1, max_value=num_trade_groups,
-            value=st.session_state[idx_key],
             label_visibility="collapsed",
             step=1, key=idx_key,
         )
 
-def _group_trades(trades: pd.DataFrame, grouping_gap_threshold: timedelta) -> pd.DataFrame:
+@trace.traced("Trader.trade_gaps")
+def _trade_gaps(trades: pd.DataFrame) -> dict:
     """
-    Adds a 'group_label' column to df where each asset/time-gap cluster gets a unique ID.
-    Returns the modified DataFrame (sorted).
+    Everything grouping needs for any gap threshold, computed once per trade set:
+    "trades" - sorted by ASSET_ID, TRADING_TIME;
+    "gaps" - per row, seconds since the previous trade of the same asset (inf where an asset starts);
+    "sorted_gaps" - the finite gaps, sorted;
+    "histogram" - (bin edges, counts) of the finite gaps on log-spaced bins.
     """
-    if trades.empty:
-        trades["group_label"] = []
-        return trades
-
-    # Ensure proper sort
     trades = trades.sort_values(["ASSET_ID", "TRADING_TIME"]).reset_index(drop=True)
+    time_ms = trades["TRADING_TIME_MS"].to_numpy(dtype="int64")
+    asset_ids = trades["ASSET_ID"].to_numpy()
 
-    # Calculate time difference from previous row
-    trades["time_diff"] = trades["TRADING_TIME"].diff()
+    gaps = np.full(len(trades), np.inf)
+    gaps[1:] = np.diff(time_ms) / 1000
+    gaps[1:][asset_ids[1:] != asset_ids[:-1]] = np.inf
+    sorted_gaps = np.sort(gaps[np.isfinite(gaps)])
 
-    # Also check if asset changes compared to previous row
-    trades["asset_change"] = trades["ASSET_ID"].ne(trades["ASSET_ID"].shift())
+    # Gaps below 1s (and exact repeats) go to the first bin
+    edges = np.geomspace(1, max(sorted_gaps[-1] if len(sorted_gaps) else 1, 1) + 1, GAP_HISTOGRAM_BINS + 1)
+    counts, _ = np.histogram(np.clip(sorted_gaps, 1, None), bins=edges)
+    return {"trades": trades, "gaps": gaps, "sorted_gaps": sorted_gaps, "histogram": (edges, counts)}
 
-    # Boolean: does this row start a new group?
-    trades["new_group"] = trades["asset_change"] | (trades["time_diff"] > grouping_gap_threshold)
+def _group_count(trade_gaps: dict, grouping_gap_threshold: float) -> int:
+    """
+    Number of groups at this threshold: one per asset start plus one per gap above it
+    (binary search over the sorted gaps).
+    """
+    sorted_gaps = trade_gaps["sorted_gaps"]
+    asset_starts = len(trade_gaps["gaps"]) - len(sorted_gaps)
+    return asset_starts + len(sorted_gaps) - int(np.searchsorted(sorted_gaps, grouping_gap_threshold, side="right"))
 
-    # Assign group numbers
-    trades["group_label"] = trades["new_group"].cumsum()
+def _group_labels(trade_gaps: dict, grouping_gap_threshold: float) -> np.ndarray:
+    """
+    Group label (1..n) per row of trade_gaps["trades"]: each asset/time-gap cluster gets its own.
+    """
+    return np.cumsum(trade_gaps["gaps"] > grouping_gap_threshold)
 
-    # Drop helper cols
-    trades = trades.drop(columns=["time_diff", "asset_change", "new_group"])
+def _build_gap_histogram(trade_gaps: dict, grouping_gap_threshold: float):
+    """
+    Distribution of the gaps between consecutive trades of an asset (log scale), with the
+    current threshold marked: gaps right of the line split groups.
+    """
+    import plotly.graph_objects as go
 
-    return trades
\ No newline at end of file
+    edges, counts = trade_gaps["histogram"]
+    fig = go.Figure(go.Bar(
+        x=np.sqrt(edges[:-1] * edges[1:]),
+        y=counts,
+        width=np.diff(edges),
+        customdata=np.stack([edges[:-1], edges[1:]], axis=1),
+        hovertemplate="%{customdata[0]:.0f}s - %{customdata[1]:.0f}s: %{y} gap(s)<extra></extra>",
+    ))
+    fig.add_vline(x=grouping_gap_threshold, line_dash="dash")
+    fig.update_layout(height=220, margin=dict(l=0, r=0, t=10, b=0), bargap=0,
+                      xaxis=dict(type="log", title="Gap between trades (s)"), yaxis=dict(title="Gaps"))
+    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
@@ -0,0 +1,21 @@
+queries = {
+    # Per-player LTV kept up to date by Snowflake (incremental refresh of new
+    # lifetime-summary rows) instead of re-aggregating the table on every load
+    "create_ltv_table": """
+        create dynamic table if not exists highlow.mptemptables.tt_player_ltv
+            target_lag = '15 minutes'
+            warehouse = {warehouse}
+            refresh_mode = incremental
+        as
+        select player_id, sum(total_amount) ltv
+        from highlow.mptemptables.tt_lifetime_summary
+        where trans_type in (3, 12, 13, 14, 20) --, 53, 62, 63, 64, 70)
+        group by player_id
+        """,
+    "ltv_inline": """
+        select player_id, sum(total_amount) ltv
+        from highlow.mptemptables.tt_lifetime_summary
+        where trans_type in (3, 12, 13, 14, 20) --, 53, 62, 63, 64, 70)
+        group by player_id
+        """,
+}
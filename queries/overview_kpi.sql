@@ -1,15 +1,27 @@
+-- One scan over the selected range and the previous equivalent period;
+-- cur tells them apart and every KPI comes twice (PREV_ = previous period)
+with trades as (
+    select ta.trader_id, ta.money_investment, ta.trader_income,
+        ta.trading_time between {start} and {end} cur
+    from highlow.marketspulse.tfc_trade_actions ta
+    join highlow.marketspulse.tfc_option_instances ins on ins.option_instance_id = ta.option_instance_id
+    join highlow.marketspulse.tfc_option_definition def on def.option_def_id = ins.option_def_id
+    join highlow.marketspulse.tp_players tp on tp.player_id = ta.trader_id 
+    where (ta.trading_time between {start} and {end} or ta.trading_time between {prev_start} and {prev_end})
+    and tp.account_type = 0
+    and ta.status in (2, 4)
+    and ({all_durations} = 1 or def.fixed_duration_value in ({durations}))
+    and ({all_assets} = 1 or def.asset_id in ({assets}))
+)
 select
-    count(*) num_trades,
-    count(distinct ta.trader_id) num_traders,
-    sum(money_investment - trader_income) site_profits,
-    sum(money_investment) site_volume,
-    site_profits / site_volume margin
-from highlow.marketspulse.tfc_trade_actions ta
-join highlow.marketspulse.tfc_option_instances ins on ins.option_instance_id = ta.option_instance_id
-join highlow.marketspulse.tfc_option_definition def on def.option_def_id = ins.option_def_id
-join highlow.marketspulse.tp_players tp on tp.player_id = ta.trader_id 
-where ta.trading_time between {start} and {end}
-and tp.account_type = 0
-and ta.status in (2, 4)
-and ({all_durations} = 1 or def.fixed_duration_value in ({durations}))
-and ({all_assets} = 1 or def.asset_id in ({assets}))
\ No newline at end of file
+    count_if(cur) num_trades,
+    count(distinct iff(cur, trader_id, null)) num_traders,
+    sum(iff(cur, money_investment - trader_income, 0)) site_profits,
+    sum(iff(cur, money_investment, 0)) site_volume,
+    div0(site_profits, site_volume) margin,
+    count_if(not cur) prev_num_trades,
+    count(distinct iff(cur, null, trader_id)) prev_num_traders,
+    sum(iff(cur, 0, money_investment - trader_income)) prev_site_profits,
+    sum(iff(cur, 0, money_investment)) prev_site_volume,
+    div0(prev_site_profits, prev_site_volume) prev_margin
+from trades
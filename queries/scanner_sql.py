@@ -0,0 +1,47 @@
+queries = {
+    # Scan partitions: one (asset, day) per row with trades in the range
+    "scan_partitions": """
+        select asset_id, trading_time::date DAY, count(*) NUM_TRADES
+        from highlow.marketspulse.tfc_trade_actions ta
+        join highlow.marketspulse.tfc_option_instances ins on ins.option_instance_id = ta.option_instance_id
+        join highlow.marketspulse.tfc_option_definition def on def.option_def_id = ins.option_def_id
+        join highlow.marketspulse.tp_players tp on tp.player_id = ta.trader_id
+        where trading_time between {start_time} and {end_time}
+        and tp.account_type = 0
+        and ({all_assets} = 1 or def.asset_id in ({assets}))
+        group by asset_id, DAY
+        order by NUM_TRADES desc
+        """,
+    # All traders' trades of one partition (same columns as all_trades)
+    "scan_trades": """
+        select trade_action_id, trader_id,
+            case trade_type % 5 when 1 then 'BUY' when 2 then 'SELL' else 'ERR' end SIDE,
+            trading_time, trading_strike, close_time, close_strike,
+            money_investment VOLUME, trader_income - money_investment PROFIT,
+            asset_id, fixed_duration_value::text DURATION
+        from highlow.marketspulse.tfc_trade_actions ta
+        join highlow.marketspulse.tfc_option_instances ins on ins.option_instance_id = ta.option_instance_id
+        join highlow.marketspulse.tfc_option_definition def on def.option_def_id = ins.option_def_id
+        join highlow.marketspulse.tp_players tp on tp.player_id = ta.trader_id
+        where asset_id = {asset_id}
+        and trading_time >= {day_start} and trading_time < {day_end}
+        and tp.account_type = 0
+        """,
+    # Ticks of one partition inside the trades' lifetimes (plus the entry lookback)
+    "scan_ticks": """
+        with windows as (
+            select distinct asset_id, trading_time, close_time
+            from highlow.marketspulse.tfc_trade_actions ta
+            join highlow.marketspulse.tfc_option_instances ins on ins.option_instance_id = ta.option_instance_id
+            join highlow.marketspulse.tfc_option_definition def on def.option_def_id = ins.option_def_id
+            where asset_id = {asset_id}
+            and trading_time >= {day_start} and trading_time < {day_end}
+        )
+        select distinct r.asset_id, r.timestamp, r.sender_timestamp, r.real_strike PRICE
+        from highlow.marketspulse.tfc_real_time_data r
+        join windows w on w.asset_id = r.asset_id
+            and r.timestamp between dateadd(second, -{lookback_seconds}, w.trading_time) and w.close_time
+        where r.asset_id = {asset_id}
+        order by r.timestamp
+        """,
+}
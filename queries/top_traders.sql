@@ -1,23 +1,50 @@
-with prominents as (
-    select
-        tp.player_name,
-        tp.player_id,
-        count(*) num_trades,
-        sum(ta.money_investment) vol,
-        sum(trader_income - money_investment) trader_pnl,
-        '' notes
+-- Leaderboard of the selected range plus each trader's rank in the previous
+-- equivalent period, from one scan over both ranges (cur tells them apart)
+with trades as (
+    select tp.player_name, tp.player_id, ta.money_investment, ta.trader_income,
+        ta.trading_time between {start} and {end} cur
     from highlow.marketspulse.tfc_trade_actions ta
     join highlow.marketspulse.tfc_option_instances ins on ins.option_instance_id = ta.option_instance_id
     join highlow.marketspulse.tfc_option_definition def on def.option_def_id = ins.option_def_id
     join highlow.marketspulse.tp_players tp on tp.player_id = ta.trader_id
-    where ta.trading_time between {start} and {end}
+    where (ta.trading_time between {start} and {end} or ta.trading_time between {prev_start} and {prev_end})
     and tp.account_type = 0
     and ta.status in (2, 4)
     and ({all_durations} = 1 or def.fixed_duration_value in ({durations}))
     and ({all_assets} = 1 or def.asset_id in ({assets}))
+),
+per_trader as (
+    select
+        player_name,
+        player_id,
+        count_if(cur) num_trades,
+        sum(iff(cur, money_investment, 0)) vol,
+        sum(iff(cur, trader_income - money_investment, 0)) trader_pnl,
+        sum(iff(cur, 0, trader_income - money_investment)) prev_trader_pnl
+    from trades
     group by 1, 2
-    having trader_pnl > {pnl_threshold}
-    order by trader_pnl desc
+),
+prev_ranks as (
+    select player_id, row_number() over (order by prev_trader_pnl desc) prev_rank
+    from per_trader
+    where prev_trader_pnl > {pnl_threshold}
+),
+prominents as (
+    select
+        t.player_name,
+        t.player_id,
+        t.num_trades,
+        t.vol,
+        t.trader_pnl,
+        '' notes,
+        row_number() over (order by t.trader_pnl desc) trader_rank,
+        pr.prev_rank,
+        t.prev_trader_pnl
+    from per_trader t
+    left join prev_ranks pr on pr.player_id = t.player_id
+    where t.num_trades > 0
+    and t.trader_pnl > {pnl_threshold}
+    order by t.trader_pnl desc
     limit {limit_rows}
 )
 select p.*, ls.ltv,
@@ -29,11 +56,7 @@ select p.*, ls.ltv,
     coalesce(sum(case trans_type when 'income' then total_amount end), 0) income,
     coalesce(sum(case trans_type when 'adjustments' then total_amount end), 0) adjustments
 from prominents p
-left join (select player_id, sum(total_amount) ltv
-    from highlow.mptemptables.tt_lifetime_summary
-    where trans_type in (3, 12, 13, 14, 20) --, 53, 62, 63, 64, 70)
-    group by player_id
-) ls on ls.player_id = p.player_id
+left join {ltv_relation} ls on ls.player_id = p.player_id
 left join highlow.mptemptables.tt_monthly_summary ms on ms.player_id = p.player_id
-group by 1, 2, 3, 4, 5, 6, 7, mm
-order by trader_pnl desc, player_id, mm
\ No newline at end of file
+group by 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, mm
+order by trader_pnl desc, player_id, mm
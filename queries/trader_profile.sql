@@ -1,4 +1,6 @@
-select player_name as username,
-    player_id 
-from highlow.marketspulse.tp_players
-where player_id = {trader_id}
\ No newline at end of file
+select tp.player_name as username,
+    tp.player_id,
+    ls.ltv
+from highlow.marketspulse.tp_players tp
+left join {ltv_relation} ls on ls.player_id = tp.player_id
+where tp.player_id = {trader_id}
\ No newline at end of file
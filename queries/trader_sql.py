@@ -17,5 +17,57 @@ queries = {
         where asset_id = {asset_id}
         and timestamp between {start_ts} and {end_ts}
         order by timestamp
+        """,
+    "rtd_sync": """
+        select asset_id, timestamp, sender_timestamp, real_strike PRICE
+        from highlow.marketspulse.tfc_real_time_data
+        where asset_id = {asset_id}
+        and timestamp >= {from_ts} and timestamp < {to_ts}
+        order by timestamp
+        """,
+    "rtd_bars_for_trades": """
+        select asset_id,
+            time_slice(timestamp, {bar_seconds}, 'SECOND') BAR_TS,
+            min_by(real_strike, timestamp) OPEN,
+            max(real_strike) HIGH,
+            min(real_strike) LOW,
+            max_by(real_strike, timestamp) CLOSE,
+            count(*) NUM_TICKS
+        from highlow.marketspulse.tfc_real_time_data
+        where asset_id = {asset_id}
+        and timestamp between {start_ts} and {end_ts}
+        group by asset_id, BAR_TS
+        order by BAR_TS
+        """,
+    "trade_window_ticks": """
+        with windows as (
+            select distinct asset_id, trading_time, close_time
+            from highlow.marketspulse.tfc_trade_actions ta
+            join highlow.marketspulse.tfc_option_instances ins on ins.option_instance_id = ta.option_instance_id
+            join highlow.marketspulse.tfc_option_definition def on def.option_def_id = ins.option_def_id 
+            where trader_id = {trader_id} 
+            and trading_time between {start_time} and {end_time} 
+        )
+        select distinct r.asset_id, r.timestamp, r.sender_timestamp, r.real_strike PRICE
+        from highlow.marketspulse.tfc_real_time_data r
+        join windows w on w.asset_id = r.asset_id
+            and r.timestamp between dateadd(second, -{lookback_seconds}, w.trading_time) and w.close_time
+        order by r.asset_id, r.timestamp
+        """,
+    "tick_density": """
+        select asset_id, max(num_ticks) / 86400 TICKS_PER_SEC
+        from (
+            select asset_id, timestamp::date day, count(*) num_ticks
+            from highlow.marketspulse.tfc_real_time_data
+            where timestamp >= dateadd(day, -7, current_date())
+            group by asset_id, day
+        )
+        group by asset_id
+        """,
+    "players_index": """
+        select player_id, player_name USERNAME, email
+        from highlow.marketspulse.tp_players
+        where player_id > {min_player_id}
+        order by player_id
         """
 }
\ No newline at end of file